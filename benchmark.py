@@ -0,0 +1,469 @@
+import collections
+import gc
+import getopt
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from edl_parser import iterEvents, iterEventsParallel
+from timecode import FrameRate, timecodesToFrames, framesToTimecodes
+from clip_matcher import ClipNameIndex, catalogTitle
+from event_scheduler import EventScheduler
+from data_signer import DataSigner
+from content_store import getResidentMemory
+from dry_run import DryRun, makeMemoryKeyChain
+
+try:
+  import asyncio
+except ImportError:
+  import trollius as asyncio
+
+try:
+  import tracemalloc
+except ImportError:
+  # Python 2; memory per event is estimated from the resident memory instead
+  tracemalloc = None
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+# Metrics named like this are better when higher; all others when lower
+_HIGHER_IS_BETTER_SUFFIX = "PerSecond"
+
+_WORDS = ["kitchen", "wall", "gfx", "pov", "rails", "email", "screen", "overlay", "temp",
+  "title", "interview", "broll", "drone", "street", "night", "crowd", "river", "bridge",
+  "market", "sunset", "archive", "studio", "wide", "close", "hand", "held", "slow", "pan"]
+_EFFECTS = ["Constant Power", "Cross Dissolve", "Dip to Black", "Additive Dissolve"]
+
+def generateClips(count, seed = None, rate = FrameRate(30)):
+  """
+  Make up the media of a synthetic project: camera files like
+  "AA012301.mov", named clips like "Kitchen wall GFX v2.mov" and a few audio
+  files like "1T01.WAV", each starting at its own source timecode
+  :return: A list of (clip name, first frame)
+  """
+  rand = random.Random(seed)
+  clips = []
+  for idx in range(count):
+    kind = rand.random()
+    if kind < 0.6:
+      name = "%s%06d.mov" % (rand.choice(["AA", "AB", "BC", "DR"]), idx)
+    elif kind < 0.9:
+      words = rand.sample(_WORDS, rand.randint(2, 4))
+      name = " ".join(words).capitalize() + " v" + str(idx) + ".mov"
+    else:
+      name = "%dT%04d.WAV" % (rand.randint(1, 9), idx)
+    clips.append((name, rate.componentsToFrames(rand.randint(0, 23), rand.randint(0, 59), rand.randint(0, 59), 0)))
+  return clips
+
+def generateCatalog(clips, size, seed = None, fuzzyFraction = 0.1, missingFraction = 0.1):
+  """
+  Make up a video catalog holding the video clips: most under the title they
+  are looked up under, fuzzyFraction of them under a slightly different
+  title, missingFraction of them not at all; padded with unrelated titles
+  up to size titles
+  :return: A dict of title -> videoId, as getVideoUrlDict returns
+  """
+  rand = random.Random(seed)
+  catalog = dict()
+  for clipName, _ in clips:
+    title = catalogTitle(clipName)
+    if title is None:
+      continue
+    kind = rand.random()
+    if kind < missingFraction:
+      continue
+    if kind < missingFraction + fuzzyFraction:
+      # A typo in the title, keeping it close enough to match
+      position = rand.randrange(len(title))
+      title = title[:position] + rand.choice("abcdefghijklmnopqrstuvwxyz") + title[position + 1:] + " final"
+    catalog[title] = _makeVideoId(rand)
+  while len(catalog) < size:
+    catalog[" ".join(rand.sample(_WORDS, rand.randint(3, 6))) + " " + str(len(catalog))] = _makeVideoId(rand)
+  return catalog
+
+def _makeVideoId(rand):
+  return "".join(rand.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_") for _ in range(11))
+
+def generateAdjustmentCSV(fileName, clips, rate = FrameRate(30)):
+  """
+  Write the batch list loadEDLAdjustment reads, with the first frame of every clip
+  """
+  with open(fileName, "w") as csvFile:
+    for clipName, start in clips:
+      csvFile.write("Unknown Tape," + rate.toTimecode(start) + "," + rate.toTimecode(start + rate.nominal * 600) +
+        "," + clipName + ",,,,,\n")
+
+def generateEDL(fileName, clips, eventCount, seed = None, rate = FrameRate(30),
+                transitionFraction = 0.1, speedFraction = 0.05, audioFraction = 0.2, dropFrameFraction = 0.0):
+  """
+  Write a synthetic CMX3600 EDL in the format of the Premiere exports:
+  events cutting to clips one after the other, with FROM CLIP NAME lines,
+  "AUD" lines for audio events, "M2" speed changes, and W001 wipes written
+  as a cut followed by an "FCM:" line, the wipe, an EFFECTS NAME line and
+  the FROM and TO CLIP NAMEs. The source times of an event are within the
+  first minute after the start of its clip, as EDL adjustments expect.
+  :param transitionFraction: The fraction of events that are W001 wipes
+  :param speedFraction: The fraction of events with an M2 speed change
+  :param audioFraction: The fraction of events on audio channels
+  :param dropFrameFraction: The fraction of wipes switching to drop frame counting
+  """
+  rand = random.Random(seed)
+  videoClips = [clip for clip in clips if catalogTitle(clip[0]) is not None]
+  audioClips = [clip for clip in clips if catalogTitle(clip[0]) is None] or videoClips
+  dstSeconds = 0.0
+  with open(fileName, "w") as edlFile:
+    edlFile.write("TITLE: SYNTHETIC-" + str(eventCount) + "\nFCM: " + ("DROP" if rate.dropFrame else "NON-DROP") +
+      " FRAME\n\n")
+    for eventId in range(1, eventCount + 1):
+      isAudio = rand.random() < audioFraction
+      clipName, clipStart = rand.choice(audioClips if isAudio else videoClips)
+      duration = rand.uniform(1, 8)
+      srcIn = clipStart + rand.randint(0, 50 * rate.nominal)
+      srcOut = srcIn + int(duration * rate.fps)
+      dstIn = int(dstSeconds * rate.fps)
+      dstOut = int((dstSeconds + duration) * rate.fps)
+      channel = rand.choice(["A", "NONE"]) if isAudio else "V"
+
+      def fields(trans, srcIn, srcOut, dstIn, dstOut):
+        return ("%03d  %-8s %-5s %-8s %s %s %s %s\n" % (eventId, "AX", channel, trans,
+          rate.toTimecode(srcIn), rate.toTimecode(srcOut), rate.toTimecode(dstIn), rate.toTimecode(dstOut)))
+      if not isAudio and rand.random() < transitionFraction:
+        toClipName = rand.choice(videoClips)[0]
+        edlFile.write(fields("C", srcIn, srcIn, dstIn, dstIn))
+        if rand.random() < dropFrameFraction:
+          rate = rate.withFCM(not rate.dropFrame)
+        edlFile.write("FCM: " + ("DROP" if rate.dropFrame else "NON-DROP") + " FRAME\n")
+        edlFile.write(fields("W001 010", srcIn, srcOut, dstIn, dstOut))
+        edlFile.write("EFFECTS NAME IS " + rand.choice(_EFFECTS) + "\n")
+        edlFile.write("* FROM CLIP NAME: " + clipName + "\n* TO CLIP NAME: " + toClipName + "\n")
+      else:
+        edlFile.write(fields("C", srcIn, srcOut, dstIn, dstOut))
+        edlFile.write("* FROM CLIP NAME: " + clipName + "\n")
+        if not isAudio and rand.random() < speedFraction:
+          edlFile.write("M2   AX       " + str(rand.choice([-24.0, 12.0, 48.0])) + "                      " +
+            rate.toTimecode(srcIn) + " \n")
+      if isAudio:
+        edlFile.write("AUD  3    4\n")
+      edlFile.write("\n")
+      dstSeconds += duration
+
+def _perSecond(func, items, minSeconds = 0.2):
+  """
+  :return: How many items per second func(item) gets through, over passes
+    of items lasting at least minSeconds in total
+  """
+  count = 0
+  start = time.time()
+  while True:
+    for item in items:
+      func(item)
+    count += len(items)
+    elapsed = time.time() - start
+    if elapsed >= minSeconds:
+      return count / elapsed
+
+class _Quiet(object):
+  """
+  Drops what the publisher prints while running, so that the console does not set the pace
+  """
+  def __enter__(self):
+    self._stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+
+  def __exit__(self, *exc):
+    sys.stdout.close()
+    sys.stdout = self._stdout
+
+class Benchmark(object):
+  """
+  Measures the parts of the publisher that set how large an EDL it keeps
+  up with, on synthetic EDLs, catalogs and adjustment CSVs written to a
+  temporary directory:
+  - parse: events per second and MB per second of iterEvents, and of
+    iterEventsParallel with parseProcesses > 1
+  - memory: bytes per parsed event
+  - timecode: timecode to frames and back per second, one at a time and batched
+  - clips: ClipNameIndex build time, and exact, fuzzy and missed lookups per
+    second, also on a catalog of largeCatalogSize titles
+  - scheduler: how late EventScheduler runs entries on a real event loop, in milliseconds
+  - sign: packets built and signed per second, with RSA and with digests
+  - publish: events published per second by a DryRun of the synthetic EDL,
+    with EDL adjustments, catalog lookups and translations
+  """
+  def __init__(self, eventCount = 20000, clipCount = 2000, catalogSize = 20000, seed = 0,
+               parseProcesses = 1, schedulerSeconds = 2.0, publishEventCount = 5000, largeCatalogSize = 50000):
+    """
+    :param eventCount: The number of events of the EDL parsed
+    :param clipCount: The number of clips the EDLs cut between
+    :param catalogSize: The number of titles in the video catalog
+    :param parseProcesses: If more than 1, also parse with iterEventsParallel in that many processes
+    :param schedulerSeconds: How long the scheduler runs for on the real clock
+    :param publishEventCount: The number of events of the EDL published by a dry run
+    :param largeCatalogSize: The number of titles of the larger catalog clip matching is measured on
+    """
+    self._parameters = collections.OrderedDict([
+      ('eventCount', eventCount),
+      ('clipCount', clipCount),
+      ('catalogSize', catalogSize),
+      ('seed', seed),
+      ('parseProcesses', parseProcesses),
+      ('schedulerSeconds', schedulerSeconds),
+      ('publishEventCount', publishEventCount),
+      ('largeCatalogSize', largeCatalogSize)
+    ])
+    self._rate = FrameRate(30)
+    self._results = collections.OrderedDict()
+    self._directory = None
+
+  def getParameters(self):
+    return self._parameters
+
+  def run(self):
+    """
+    :return: A dict of metric name -> value; names ending in "PerSecond" are better when higher
+    :rtype: dict
+    """
+    parameters = self._parameters
+    self._directory = tempfile.mkdtemp(prefix = "edl-benchmark-")
+    try:
+      seed = parameters['seed']
+      self._clips = generateClips(parameters['clipCount'], seed, self._rate)
+      self._catalog = generateCatalog(self._clips, parameters['catalogSize'], seed)
+      self._edlFile = os.path.join(self._directory, "synthetic.edl")
+      generateEDL(self._edlFile, self._clips, parameters['eventCount'], seed, self._rate, dropFrameFraction = 0.05)
+      self._publishEdlFile = os.path.join(self._directory, "synthetic-publish.edl")
+      generateEDL(self._publishEdlFile, self._clips, parameters['publishEventCount'], seed, self._rate)
+      self._csvFile = os.path.join(self._directory, "adjustments.csv")
+      generateAdjustmentCSV(self._csvFile, self._clips, self._rate)
+
+      for name, measure in [("parse", self.measureParse), ("memory", self.measureMemory),
+                            ("timecode", self.measureTimecode), ("clips", self.measureClipMatching),
+                            ("scheduler", self.measureScheduler), ("sign", self.measureSigning),
+                            ("publish", self.measurePublishing)]:
+        print("Measuring " + name + "...")
+        for metric, value in measure().items():
+          self._results[name + "." + metric] = value
+    finally:
+      shutil.rmtree(self._directory, True)
+    return self._results
+
+  def measureParse(self):
+    results = collections.OrderedDict()
+    megabytes = os.path.getsize(self._edlFile) / 1e6
+    gc.collect()
+    start = time.time()
+    count = sum(1 for _ in iterEvents(self._edlFile, self._rate))
+    elapsed = time.time() - start
+    results['eventsPerSecond'] = count / elapsed
+    results['megabytesPerSecond'] = megabytes / elapsed
+    if self._parameters['parseProcesses'] > 1:
+      start = time.time()
+      count = sum(1 for _ in iterEventsParallel(self._edlFile, self._rate, self._parameters['parseProcesses']))
+      elapsed = time.time() - start
+      results['parallelEventsPerSecond'] = count / elapsed
+    return results
+
+  def measureMemory(self):
+    gc.collect()
+    if tracemalloc is not None:
+      tracemalloc.start()
+      events = list(iterEvents(self._edlFile, self._rate))
+      allocated = tracemalloc.get_traced_memory()[0]
+      tracemalloc.stop()
+    else:
+      before = getResidentMemory()
+      events = list(iterEvents(self._edlFile, self._rate))
+      after = getResidentMemory()
+      allocated = None if before is None or after is None else after - before
+    if allocated is None:
+      return dict()
+    return {'bytesPerEvent': float(allocated) / len(events)}
+
+  def measureTimecode(self):
+    results = collections.OrderedDict()
+    rand = random.Random(self._parameters['seed'])
+    for label, rate in [("", self._rate), ("dropFrame", FrameRate(29.97, True))]:
+      frames = [rand.randint(0, 24 * 3600 * rate.nominal - 1) for _ in range(10000)]
+      timecodes = [rate.toTimecode(frame) for frame in frames]
+      results[label + ('ToFrames' if label else 'toFrames') + 'PerSecond'] = _perSecond(rate.toFrames, timecodes)
+      results[label + ('ToTimecode' if label else 'toTimecode') + 'PerSecond'] = _perSecond(rate.toTimecode, frames)
+      if numpy is not None:
+        results[label + ('Batch' if label else 'batch') + 'ToFramesPerSecond'] = \
+          _perSecond(lambda _: timecodesToFrames(timecodes, rate), [None]) * len(timecodes)
+        batchFrames = numpy.asarray(frames, dtype = numpy.int64)
+        results[label + ('Batch' if label else 'batch') + 'ToTimecodePerSecond'] = \
+          _perSecond(lambda _: framesToTimecodes(batchFrames, rate), [None]) * len(frames)
+    return results
+
+  def measureClipMatching(self):
+    results = collections.OrderedDict()
+    largeCatalog = generateCatalog(self._clips, self._parameters['largeCatalogSize'], self._parameters['seed'])
+    for prefix, catalog in [("", self._catalog), ("largeCatalog", largeCatalog)]:
+      start = time.time()
+      index = ClipNameIndex(catalog)
+      results[prefix + ('IndexBuildSeconds' if prefix else 'indexBuildSeconds')] = time.time() - start
+      titles = [catalogTitle(clipName) for clipName, _ in self._clips]
+      titles = [title for title in titles if title is not None]
+      exact = [title for title in titles if title in catalog]
+      missing = [title for title in titles if title not in catalog]
+      rand = random.Random(self._parameters['seed'])
+      misses = [" ".join(rand.sample(_WORDS, 3)) + " take " + str(idx) for idx in range(1000)]
+      for metric, queries in [('exactLookupsPerSecond', exact), ('fuzzyLookupsPerSecond', missing),
+                              ('missLookupsPerSecond', misses)]:
+        if queries:
+          results[prefix + (metric[0].upper() + metric[1:] if prefix else metric)] = self._lookupRate(index, queries)
+    return results
+
+  def _lookupRate(self, index, queries):
+    # Lookups are cached by the index; every pass starts from an empty cache
+    count = 0
+    elapsed = 0.0
+    while elapsed < 0.2:
+      index._cache.clear()
+      start = time.time()
+      for query in queries:
+        index.lookup(query)
+      elapsed += time.time() - start
+      count += len(queries)
+    return count / elapsed
+
+  def measureScheduler(self):
+    loop = asyncio.new_event_loop()
+    try:
+      duration = self._parameters['schedulerSeconds']
+      interval = 0.005
+      count = int(duration / interval)
+      scheduler = EventScheduler(loop, count)
+      for idx in range(count):
+        scheduler.schedule(idx * interval, lambda: None)
+      scheduler.start(0)
+      loop.call_later(duration + 0.1, loop.stop)
+      loop.run_forever()
+      lateness = sorted(scheduler.getLatenessStats()['recent'])
+    finally:
+      loop.close()
+    if not lateness:
+      return dict()
+    return collections.OrderedDict([
+      ('meanLatenessMs', 1000 * sum(lateness) / len(lateness)),
+      ('p99LatenessMs', 1000 * lateness[min(len(lateness) - 1, int(0.99 * len(lateness)))]),
+      ('maxLatenessMs', 1000 * lateness[-1])
+    ])
+
+  def measureSigning(self):
+    results = collections.OrderedDict()
+    keyChain = makeMemoryKeyChain()
+    content = json.dumps({"event_id": "1", "src_url": "https://www.youtube.com/watch?v=0i1MCE8P0Gg"})
+    for metric, digestOnly in [('rsaPerSecond', False), ('digestPerSecond', True)]:
+      signer = DataSigner(keyChain, keyChain.getDefaultCertificateName(), digestOnly)
+      names = ["/ndn/edu/ucla/remap/test/edl/" + str(seq) for seq in range(200)]
+      results[metric] = _perSecond(lambda name: signer.makeData(name, content, 2000), names)
+      signer.shutdown()
+    return results
+
+  def measurePublishing(self):
+    dryRun = DryRun(translationLatency = 0.5, seed = self._parameters['seed'], applyEDLAdjustment = True)
+    publisher = dryRun.getPublisher()
+    publisher.loadEDLAdjustment(self._csvFile)
+    publisher._videoUrlDict = dict(self._catalog)
+    with _Quiet():
+      start = time.time()
+      report = dryRun.run(self._publishEdlFile)
+      elapsed = time.time() - start
+    return collections.OrderedDict([
+      ('eventsPerSecond', report['summary']['published'] / elapsed),
+      ('parseAndResolveSeconds', elapsed - report['summary']['wallSeconds'])
+    ])
+
+def loadResults(fileName):
+  """
+  :return: The runs saved in a results file, oldest first
+  :rtype: list
+  """
+  if not os.path.exists(fileName):
+    return []
+  with open(fileName, "r") as resultsFile:
+    return [json.loads(line) for line in resultsFile if line.strip()]
+
+def saveResults(fileName, parameters, results):
+  """
+  Append a run to a results file, one JSON object per line
+  """
+  run = collections.OrderedDict([
+    ('time', time.strftime("%Y-%m-%dT%H:%M:%S")),
+    ('python', platform.python_version()),
+    ('platform', platform.platform()),
+    ('numpy', numpy is not None),
+    ('parameters', parameters),
+    ('results', results)
+  ])
+  with open(fileName, "a") as resultsFile:
+    resultsFile.write(json.dumps(run) + "\n")
+
+def compareResults(previous, results, threshold = 0.1):
+  """
+  Print every metric next to its value in a previous run
+  :param previous: The results of the previous run, or None
+  :param threshold: The relative change counted as a regression
+  :return: The names of the metrics that got worse by more than threshold
+  :rtype: list
+  """
+  regressions = []
+  for metric, value in results.items():
+    line = "%-40s %14.4g" % (metric, value)
+    if previous is not None and previous.get(metric):
+      change = (value - previous[metric]) / float(previous[metric])
+      worse = -change if metric.endswith(_HIGHER_IS_BETTER_SUFFIX) else change
+      line += "  (was %.4g, %+.1f%%)" % (previous[metric], 100 * change)
+      if worse > threshold:
+        regressions.append(metric)
+        line += "  REGRESSION"
+    print(line)
+  return regressions
+
+def usage():
+  print("Usage: python benchmark.py [-n events] [-c clips] [-k catalog-size] [-K large-catalog-size]\n"
+        "         [-e publish-events] [-p processes] [-s seed] [-o results.jsonl] [-t threshold] [-q]\n"
+        "  Results are appended to the results file (benchmark-results.jsonl by default) and\n"
+        "  compared with the last run there with the same parameters and Python version; the\n"
+        "  exit status is 1 if a metric got worse by more than the threshold (0.1 by default).\n"
+        "  -q  Quick run with small inputs")
+
+if __name__ == '__main__':
+  try:
+    opts, args = getopt.getopt(sys.argv[1:], "n:c:k:K:e:p:s:o:t:qh")
+  except getopt.GetoptError as e:
+    print(str(e))
+    usage()
+    sys.exit(2)
+  opts = dict(opts)
+  if "-h" in opts or args:
+    usage()
+    sys.exit(0 if "-h" in opts else 2)
+
+  quick = "-q" in opts
+  benchmark = Benchmark(int(opts.get("-n", 2000 if quick else 20000)), int(opts.get("-c", 200 if quick else 2000)),
+    int(opts.get("-k", 2000 if quick else 20000)), int(opts.get("-s", 0)), int(opts.get("-p", 1)),
+    0.5 if quick else 2.0, int(opts.get("-e", 500 if quick else 5000)), int(opts.get("-K", 5000 if quick else 50000)))
+  resultsFile = opts.get("-o", "benchmark-results.jsonl")
+  results = benchmark.run()
+
+  previous = None
+  for run in reversed(loadResults(resultsFile)):
+    if (run['parameters'] == benchmark.getParameters() and
+        run['python'].split('.')[:2] == platform.python_version().split('.')[:2]):
+      previous = run['results']
+      break
+  regressions = compareResults(previous, results, float(opts.get("-t", 0.1)))
+  saveResults(resultsFile, benchmark.getParameters(), results)
+  if regressions:
+    print(str(len(regressions)) + " regressions: " + ", ".join(regressions))
+    sys.exit(1)
@@ -0,0 +1,152 @@
+import json
+import os
+
+try:
+  import urllib2 as urllib
+except ImportError:
+  import urllib.request as urllib
+
+try:
+  from urllib import urlencode
+except ImportError:
+  from urllib.parse import urlencode
+
+try:
+  _replace = os.replace
+except AttributeError:
+  # Python 2, where rename already replaces an existing file on POSIX
+  _replace = os.rename
+
+YOUTUBE_API_URL = 'https://www.googleapis.com/youtube/v3/'
+
+class ChannelIndex(object):
+  """
+  A persistent title -> videoId index of a Youtube channel's uploads.
+
+  The index is refreshed incrementally through a page fetcher, a function
+  fetchPage(pageToken, etag) returning (items, nextPageToken, etag), or None
+  if etag still matches. items is a list of (title, videoId) pairs, newest
+  upload first. Paging stops at the first page with an already known
+  video. When several videos share a title, the oldest upload wins, as it
+  did when the whole channel was listed.
+  """
+  def __init__(self, path):
+    """
+    :param path: The JSON file the index is kept in; loaded if it exists
+    """
+    self._path = path
+    self._titles = dict()
+    self._videoIds = set()
+    self._etag = None
+    if os.path.exists(path):
+      with open(path, 'r') as indexFile:
+        content = json.load(indexFile)
+      self._titles = content['titles']
+      self._videoIds = set(content['videoIds'])
+      self._etag = content.get('etag')
+
+  def save(self):
+    content = {
+      'titles': self._titles,
+      'videoIds': sorted(self._videoIds),
+      'etag': self._etag
+    }
+    # Written aside and moved over the index so that a crash never leaves a truncated one
+    tmpPath = self._path + '.tmp'
+    with open(tmpPath, 'w') as indexFile:
+      json.dump(content, indexFile)
+    _replace(tmpPath, self._path)
+
+  def refresh(self, fetchPage, full = False):
+    """
+    Fetch the uploads added since the last refresh and save the index.
+    :param fetchPage: The page fetcher of the channel
+    :param full: If True, list the whole channel again and drop videos that
+      no longer exist (incremental refreshes do not notice deletions)
+    :return: The number of new videos
+    :rtype: int
+    """
+    newItems = []
+    pageToken = None
+    etag = None if full else self._etag
+    firstPage = True
+    while True:
+      page = fetchPage(pageToken, etag if firstPage else None)
+      if page is None:
+        # Not modified since the last refresh
+        return 0
+      items, pageToken, pageEtag = page
+      if firstPage:
+        firstEtag = pageEtag
+        firstPage = False
+      reachedKnown = False
+      for title, videoId in items:
+        if not full and videoId in self._videoIds:
+          reachedKnown = True
+          continue
+        newItems.append((title, videoId))
+      if reachedKnown or pageToken is None:
+        break
+
+    if full:
+      self._titles = dict()
+      self._videoIds = set()
+    # Oldest first, so that the oldest upload keeps a shared title
+    for title, videoId in reversed(newItems):
+      if videoId not in self._videoIds:
+        self._videoIds.add(videoId)
+        self._titles.setdefault(title, videoId)
+    self._etag = firstEtag
+    self.save()
+    return len(newItems)
+
+  def getTitles(self):
+    """
+    :return: The index as a dict of title -> videoId
+    :rtype: dict
+    """
+    return self._titles
+
+  def getVideoUrlDict(self):
+    """
+    :return: The index keyed by lower case title, as matched against clip names
+    :rtype: dict
+    """
+    return dict((title.lower(), videoId) for title, videoId in self._titles.items())
+
+  def __len__(self):
+    return len(self._titles)
+
+def makePublicPageFetcher(channelId, accessKey, apiUrl = YOUTUBE_API_URL, maxResults = 50):
+  """
+  :return: A page fetcher listing a public channel through the search API
+    with an API key, without OAuth
+  """
+  def fetchPage(pageToken, etag):
+    options = {
+      'key': accessKey,
+      'channelId': channelId,
+      'part': 'snippet,id',
+      'order': 'date',
+      'maxResults': str(maxResults)
+    }
+    if pageToken is not None:
+      options['pageToken'] = pageToken
+    request = urllib.Request(apiUrl + 'search?' + urlencode(options))
+    if etag is not None:
+      request.add_header('If-None-Match', etag)
+    try:
+      response = urllib.urlopen(request)
+    except urllib.HTTPError as e:
+      if e.code == 304:
+        return None
+      raise
+    result = json.loads(response.read().decode('utf-8'))
+    items = []
+    for item in result['items']:
+      if 'snippet' in item and 'id' in item and 'videoId' in item['id']:
+        items.append((item['snippet']['title'], item['id']['videoId']))
+      else:
+        print("Unexpected JSON from youtube channel query")
+    return (items, result.get('nextPageToken'), result.get('etag'))
+  return fetchPage
@@ -0,0 +1,143 @@
+import re
+import math
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+_nonAlphanumericRegex = re.compile(r'[^0-9a-z]+')
+
+def normalizeTitle(title):
+  """
+  Lower case, with punctuation, underscores and dashes collapsed to single spaces
+  """
+  return _nonAlphanumericRegex.sub(' ', title.lower()).strip()
+
+def catalogTitle(clipName):
+  """
+  :return: The title a FROM CLIP NAME is looked up under in the video
+    catalog: lower case, with underscores and dashes as spaces and without
+    the file extension; None for audio clips (.wav or .mp3), which are not
+  """
+  parsedClipName = clipName.lower().replace('_', ' ').replace('-', ' ')
+  if parsedClipName.endswith('.wav') or parsedClipName.endswith('.mp3'):
+    return None
+  return (" ").join(parsedClipName.split('.')[:-1])
+
+def _ngrams(text, n):
+  padded = ' ' + text + ' '
+  return set(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+class ClipNameIndex(object):
+  """
+  Character n-gram inverted index over the titles of a video catalog, for
+  matching FROM CLIP NAMEs that differ slightly from the video title.
+
+  Matches are scored with the Dice coefficient of the n-gram sets (1.0 for
+  identical normalized names). With NumPy, the n-grams every title shares
+  with the query are counted at once from the postings of the query's
+  n-grams, which keeps fuzzy and missed lookups under a millisecond on
+  50,000 titles (see the clips metrics of benchmark.py). Without it,
+  candidates are gathered from the postings of the query's rarest n-grams,
+  as many as needed for a title to still be able to reach the threshold,
+  and scored one by one; that takes a few milliseconds on catalogs that large.
+  """
+  def __init__(self, videoUrlDict, threshold = 0.8, n = 3):
+    """
+    :param videoUrlDict: A dict of title -> videoId
+    :param threshold: The minimum score of an accepted match, between 0 and 1
+    :param n: The n-gram length
+    """
+    self._threshold = threshold
+    self._n = n
+    self._titles = []
+    self._videoIds = []
+    self._grams = []
+    self._exact = dict()
+    # n-gram -> indices into self._titles
+    self._postings = dict()
+    for title, videoId in videoUrlDict.items():
+      normalized = normalizeTitle(title)
+      if normalized in self._exact:
+        continue
+      idx = len(self._titles)
+      self._exact[normalized] = idx
+      self._titles.append(title)
+      self._videoIds.append(videoId)
+      grams = _ngrams(normalized, n)
+      self._grams.append(frozenset(grams))
+      for gram in grams:
+        self._postings.setdefault(gram, []).append(idx)
+    if numpy is not None:
+      for gram, posting in self._postings.items():
+        self._postings[gram] = numpy.array(posting, dtype = numpy.int32)
+      self._gramCounts = numpy.array([len(grams) for grams in self._grams], dtype = numpy.float64)
+    self._cache = dict()
+
+  def lookup(self, clipName):
+    """
+    :param clipName: The clip name, without its file extension
+    :return: (videoId, title, score) of the best match, or None if no title
+      scores at least the threshold
+    """
+    if clipName in self._cache:
+      return self._cache[clipName]
+    result = self._lookup(normalizeTitle(clipName))
+    self._cache[clipName] = result
+    return result
+
+  def resolveAll(self, clipNames):
+    """
+    :return: A dict of clipName -> lookup(clipName) for every distinct name
+    :rtype: dict
+    """
+    return dict((clipName, self.lookup(clipName)) for clipName in set(clipNames))
+
+  def _lookup(self, normalized):
+    if normalized in self._exact:
+      idx = self._exact[normalized]
+      return (self._videoIds[idx], self._titles[idx], 1.0)
+
+    queryGrams = _ngrams(normalized, self._n)
+    queryCount = len(queryGrams)
+    grams = [gram for gram in queryGrams if gram in self._postings]
+    # A title sharing o n-grams scores 2o / (queryCount + titleCount) with
+    # titleCount >= o, so reaching the threshold needs o >= minOverlap; such a
+    # title must share at least one of the (queryCount - minOverlap + 1) rarest
+    # n-grams, the n-grams no title has being the rarest of all
+    minOverlap = int(math.ceil(self._threshold * queryCount / (2 - self._threshold) - 1e-9))
+    prefixLength = queryCount - minOverlap + 1 - (queryCount - len(grams))
+    if prefixLength <= 0:
+      return None
+    if numpy is not None and grams:
+      return self._lookupCounting(grams, queryCount)
+    grams.sort(key = lambda gram: len(self._postings[gram]))
+    candidates = set()
+    for gram in grams[:prefixLength]:
+      candidates.update(self._postings[gram])
+
+    gramSet = set(grams)
+    best = None
+    bestScore = self._threshold
+    for idx in candidates:
+      titleGrams = self._grams[idx]
+      score = 2.0 * len(gramSet.intersection(titleGrams)) / (queryCount + len(titleGrams))
+      if score > bestScore or (best is None and score >= bestScore):
+        best = idx
+        bestScore = score
+    if best is None:
+      return None
+    return (self._videoIds[best], self._titles[best], bestScore)
+
+  def _lookupCounting(self, grams, queryCount):
+    overlaps = numpy.bincount(numpy.concatenate([self._postings[gram] for gram in grams]),
+      minlength = len(self._titles))
+    scores = 2.0 * overlaps / (queryCount + self._gramCounts)
+    best = int(scores.argmax())
+    if scores[best] < self._threshold:
+      return None
+    return (self._videoIds[best], self._titles[best], float(scores[best]))
+
+  def __len__(self):
+    return len(self._titles)
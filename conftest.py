@@ -0,0 +1,2 @@
+# The publisher script is named test_edl_parser.py, but holds no tests; see tests/
+collect_ignore = ["test_edl_parser.py"]
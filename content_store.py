@@ -0,0 +1,199 @@
+import collections
+import os
+import sys
+import time
+
+try:
+  import resource
+except ImportError:
+  resource = None
+
+class BoundedContentCache(object):
+  """
+  A drop-in replacement for pyndn.util.MemoryContentCache for the
+  publisher, capped by packet count and/or total wire size. The oldest
+  packets are evicted first once a cap is exceeded, and with a retention
+  period, cleanup() drops packets older than it. cleanup() also drops the
+  expired pending Interests, and runs periodically while there is anything
+  left to drop if a loop is given.
+
+  Interests for an exact packet name are answered with a dict lookup;
+  other Interests fall back to scanning the cached packets, honoring
+  ChildSelector and MustBeFresh like MemoryContentCache. Interests kept with
+  storePendingInterest are answered by add() until they expire.
+  """
+  def __init__(self, face, maxPackets = None, maxBytes = None,
+               retentionMilliseconds = None, loop = None, cleanupIntervalSeconds = 10):
+    """
+    :param face: The Face to register prefixes on and answer Interests with
+    :param maxPackets: The maximum number of packets kept, or None
+    :param maxBytes: The maximum total wire size of the packets kept, or None
+    :param retentionMilliseconds: How long a packet is kept after it is
+      added, or None to keep it until evicted
+    :param loop: If given, cleanup() runs on it every cleanupIntervalSeconds
+      while Interests are pending or, with a retention period, packets are cached
+    """
+    self._face = face
+    self._maxPackets = maxPackets
+    self._maxBytes = maxBytes
+    self._retention = None if retentionMilliseconds is None else retentionMilliseconds / 1000.0
+    # name URI -> (data, size, time added), oldest first
+    self._packets = collections.OrderedDict()
+    self._bytes = 0
+    self._evictedCount = 0
+    self._hitCount = 0
+    self._missCount = 0
+    self._onDataNotFound = dict()
+    # [(interest, face, expiry time)] of the Interests waiting for a packet
+    self._pendingInterests = []
+    # Interests at least this long can only match a packet name exactly
+    self._maxNameSize = 0
+    self._loop = loop
+    self._cleanupInterval = cleanupIntervalSeconds
+    self._cleanupTimer = None
+
+  def registerPrefix(self, prefix, onRegisterFailed, onDataNotFound = None):
+    """
+    Register prefix on the face and answer Interests under it from the cache
+    :param onDataNotFound: Called as MemoryContentCache calls it when no
+      cached packet matches
+    """
+    self._onDataNotFound[prefix.toUri()] = onDataNotFound
+    self._face.registerPrefix(prefix, self._onInterest, onRegisterFailed)
+
+  def add(self, data):
+    name = data.getName().toUri()
+    size = data.wireEncode().size()
+    if name in self._packets:
+      self._bytes -= self._packets.pop(name)[1]
+    self._packets[name] = (data, size, time.time())
+    self._maxNameSize = max(self._maxNameSize, data.getName().size())
+    self._bytes += size
+    if self._pendingInterests:
+      self._answerPendingInterests(data)
+    if self._retention is not None:
+      self._scheduleCleanup()
+    while self._packets and ((self._maxPackets is not None and len(self._packets) > self._maxPackets) or
+                             (self._maxBytes is not None and self._bytes > self._maxBytes)):
+      self._bytes -= self._packets.popitem(last = False)[1][1]
+      self._evictedCount += 1
+
+  def storePendingInterest(self, interest, face):
+    """
+    Keep an Interest no cached packet matches, to answer it from add() if a
+    matching packet is added before the Interest expires; called from
+    onDataNotFound, as with MemoryContentCache
+    """
+    lifetime = interest.getInterestLifetimeMilliseconds()
+    if lifetime is None or lifetime < 0:
+      lifetime = 4000
+    self._pendingInterests.append((interest, face, time.time() + lifetime / 1000.0))
+    self._scheduleCleanup()
+
+  def cleanup(self):
+    """
+    Drop the expired pending Interests and the packets older than the retention period
+    :return: The number of packets dropped
+    """
+    now = time.time()
+    self._pendingInterests = [entry for entry in self._pendingInterests if entry[2] > now]
+    if self._retention is None:
+      return 0
+    threshold = now - self._retention
+    removed = 0
+    while self._packets:
+      name, (data, size, added) = next(iter(self._packets.items()))
+      if added >= threshold:
+        break
+      del self._packets[name]
+      self._bytes -= size
+      removed += 1
+    return removed
+
+  def getStats(self):
+    """
+    :return: A dict with the number and total wire size of the cached
+      packets, the eviction, hit and miss counts and the number of pending Interests
+    """
+    return {
+      'packets': len(self._packets),
+      'bytes': self._bytes,
+      'evicted': self._evictedCount,
+      'hits': self._hitCount,
+      'misses': self._missCount,
+      'pendingInterests': len(self._pendingInterests)
+    }
+
+  def __len__(self):
+    return len(self._packets)
+
+  def _answerPendingInterests(self, data):
+    now = time.time()
+    pendingInterests = []
+    for interest, face, expiry in self._pendingInterests:
+      if expiry <= now:
+        continue
+      if interest.matchesName(data.getName()):
+        face.putData(data)
+      else:
+        pendingInterests.append((interest, face, expiry))
+    self._pendingInterests = pendingInterests
+
+  def _scheduleCleanup(self):
+    if self._loop is not None and self._cleanupTimer is None:
+      self._cleanupTimer = self._loop.call_later(self._cleanupInterval, self._periodicCleanup)
+
+  def _periodicCleanup(self):
+    self._cleanupTimer = None
+    self.cleanup()
+    # Not rearmed when idle, so that the timer does not keep a loop run to completion going
+    if self._pendingInterests or (self._retention is not None and self._packets):
+      self._scheduleCleanup()
+
+  def _onInterest(self, prefix, interest, face, interestFilterId, filter):
+    data = self._find(interest)
+    if data is not None:
+      self._hitCount += 1
+      face.putData(data)
+      return
+    self._missCount += 1
+    onDataNotFound = self._onDataNotFound.get(prefix.toUri())
+    if onDataNotFound is not None:
+      onDataNotFound(prefix, interest, face, interestFilterId, filter)
+
+  def _find(self, interest):
+    now = time.time()
+    entry = self._packets.get(interest.getName().toUri())
+    if entry is not None and self._isUsable(interest, entry, now):
+      return entry[0]
+    if interest.getName().size() >= self._maxNameSize:
+      return None
+    # Rightmost child: newest packet first, as our names grow with time
+    entries = self._packets.values()
+    if interest.getChildSelector() == 1:
+      entries = reversed(list(entries))
+    for entry in entries:
+      if interest.matchesName(entry[0].getName()) and self._isUsable(interest, entry, now):
+        return entry[0]
+    return None
+
+  def _isUsable(self, interest, entry, now):
+    if not interest.getMustBeFresh():
+      return True
+    freshnessPeriod = entry[0].getMetaInfo().getFreshnessPeriod()
+    return freshnessPeriod is None or freshnessPeriod < 0 or now - entry[2] < freshnessPeriod / 1000.0
+
+def getResidentMemory():
+  """
+  :return: The current resident memory of this process in bytes, or None if unknown
+  """
+  try:
+    with open('/proc/self/statm') as statm:
+      return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+  except (IOError, OSError, ValueError):
+    pass
+  if resource is None:
+    return None
+  # Peak rather than current memory; kilobytes on Linux, bytes on macOS
+  maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return maxrss if sys.platform == 'darwin' else maxrss * 1024
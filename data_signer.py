@@ -0,0 +1,88 @@
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pyndn import Name, Data
+from pyndn.security import KeyChain
+
+class DataSigner(object):
+  """
+  Builds and signs the Data packets of the publisher, either on the calling
+  thread or ahead of time on a background thread.
+
+  With digestOnly, packets carry a SHA-256 digest signature instead of an
+  RSA signature by the certificate; much cheaper, but it only protects
+  integrity, so it is meant for trusted deployments.
+
+  PyNDN's KeyChain is not thread-safe: keyChain is only used on the calling
+  thread, and each background thread signs with a KeyChain of its own.
+  """
+  def __init__(self, keyChain, certificateName, digestOnly = False, maxWorkers = 1, signTimes = None,
+               makeKeyChain = KeyChain):
+    """
+    :param keyChain: The KeyChain to sign with on the calling thread
+    :param certificateName: The certificate to sign with, unless digestOnly
+    :param digestOnly: Sign with a SHA-256 digest instead of the certificate
+    :param maxWorkers: The number of background signing threads
+    :param signTimes: A metrics.Histogram to record the time each signature takes in, or None
+    :param makeKeyChain: Called on each background thread for its KeyChain,
+      which must have the certificate; the system default one by default
+    """
+    self._keyChain = keyChain
+    self._certificateName = certificateName
+    self._digestOnly = digestOnly
+    self._executor = ThreadPoolExecutor(max_workers = maxWorkers)
+    self._signTimes = signTimes
+    self._makeKeyChain = makeKeyChain
+    self._local = threading.local()
+
+  def sign(self, data, keyChain = None):
+    """
+    :param keyChain: The KeyChain to sign with; the one of the calling thread if None
+    """
+    if keyChain is None:
+      keyChain = self._keyChain
+    start = time.time()
+    if self._digestOnly:
+      keyChain.signWithSha256(data)
+    else:
+      keyChain.sign(data, self._certificateName)
+    if self._signTimes is not None:
+      self._signTimes.record(time.time() - start)
+
+  def makeData(self, name, content, freshnessPeriod, finalBlockId = None, keyChain = None):
+    """
+    :param name: The name URI of the packet
+    :param content: The content string
+    :param freshnessPeriod: The freshness period in milliseconds
+    :param finalBlockId: The Name.Component of the last segment, if the packet is a segment
+    :param keyChain: The KeyChain to sign with; the one of the calling thread if None
+    :return: The signed Data packet
+    :rtype: Data
+    """
+    data = Data(Name(name))
+    data.setContent(content)
+    data.getMetaInfo().setFreshnessPeriod(freshnessPeriod)
+    if finalBlockId is not None:
+      data.getMetaInfo().setFinalBlockId(finalBlockId)
+    self.sign(data, keyChain)
+    return data
+
+  def submit(self, name, content, freshnessPeriod):
+    """
+    Build and sign a packet on a background thread
+    :return: A concurrent.futures.Future of the signed Data packet
+    """
+    return self._executor.submit(self._makeDataInBackground, name, content, freshnessPeriod)
+
+  def _makeDataInBackground(self, name, content, freshnessPeriod):
+    # Runs on a worker thread
+    keyChain = getattr(self._local, 'keyChain', None)
+    if keyChain is None:
+      keyChain = self._makeKeyChain()
+      self._local.keyChain = keyChain
+    return self.makeData(name, content, freshnessPeriod, keyChain = keyChain)
+
+  def shutdown(self, wait = False):
+    self._executor.shutdown(wait)
@@ -0,0 +1,440 @@
+import collections
+import csv
+import functools
+import getopt
+import heapq
+import json
+import logging
+import random
+import sys
+import time
+import traceback
+
+from pyndn import Name
+from pyndn.security import KeyChain
+from pyndn.security.identity.memory_identity_storage import MemoryIdentityStorage
+from pyndn.security.identity.memory_private_key_storage import MemoryPrivateKeyStorage
+from pyndn.security.identity.identity_manager import IdentityManager
+from pyndn.security.policy.no_verify_policy_manager import NoVerifyPolicyManager
+
+from clip_matcher import catalogTitle
+from edl_parser import iterEvents
+from local_face import LocalFace
+from test_edl_parser import NaiveEDLParserAndPublisher
+from url_translator import UrlTranslator
+
+try:
+  import asyncio
+except ImportError:
+  import trollius as asyncio
+
+try:
+  from urllib import urlencode
+except ImportError:
+  from urllib.parse import urlencode
+
+# Translated URLs handed out by the translation stub
+DRY_RUN_VIDEO_URL = "https://dry-run.invalid/video?"
+
+# event.translated when an event is published -> how its translation went
+_TRANSLATION_OUTCOMES = {
+  "translated": "on time",
+  "publish": "late",
+  "failed": "failed",
+  "non-existent": "no source"
+}
+
+class _VirtualHandle(object):
+  __slots__ = ('when', '_callback', '_args', '_cancelled')
+
+  def __init__(self, when, callback, args):
+    self.when = when
+    self._callback = callback
+    self._args = args
+    self._cancelled = False
+
+  def cancel(self):
+    self._cancelled = True
+
+  def cancelled(self):
+    return self._cancelled
+
+class VirtualClockLoop(asyncio.AbstractEventLoop):
+  """
+  An event loop whose clock only advances when the next timer is due, so
+  that an hour-long cut is published in seconds. With a speed-up factor,
+  timers are also held back until that fraction of their delay passed in
+  real time; without one, the loop runs as fast as possible.
+
+  Callbacks run on the calling thread, one at a time; an exception in a
+  callback is logged and counted, and the loop goes on as asyncio's does.
+  run_forever returns once stopped, or once nothing is left to run.
+  Functions given to run_in_executor run right away, taking no virtual
+  time.
+  """
+  def __init__(self, speedup = None):
+    """
+    :param speedup: How many times faster than real time to run, or None to
+      run as fast as possible
+    """
+    self._speedup = speedup
+    self._time = 0.0
+    self._ready = collections.deque()
+    # (when, sequence, handle) of the timers
+    self._timers = []
+    self._sequence = 0
+    self._running = False
+    self._stopping = False
+    self._closed = False
+    self._debug = False
+    self._errorCount = 0
+
+  def time(self):
+    return self._time
+
+  def call_soon(self, callback, *args, **kwargs):
+    # asyncio futures pass a context, which callbacks do not need here
+    handle = _VirtualHandle(self._time, callback, args)
+    self._ready.append(handle)
+    return handle
+
+  call_soon_threadsafe = call_soon
+
+  def call_later(self, delay, callback, *args, **kwargs):
+    return self.call_at(self._time + delay, callback, *args)
+
+  def call_at(self, when, callback, *args, **kwargs):
+    handle = _VirtualHandle(when, callback, args)
+    heapq.heappush(self._timers, (when, self._sequence, handle))
+    self._sequence += 1
+    return handle
+
+  def create_future(self):
+    return asyncio.Future(loop = self)
+
+  def run_in_executor(self, executor, func, *args):
+    future = self.create_future()
+    try:
+      future.set_result(func(*args))
+    except Exception as e:
+      future.set_exception(e)
+    return future
+
+  def run_forever(self):
+    self._running = True
+    self._stopping = False
+    wallStart = time.time()
+    virtualStart = self._time
+    try:
+      while not self._stopping:
+        if self._ready:
+          handle = self._ready.popleft()
+        elif self._timers:
+          when, _, handle = heapq.heappop(self._timers)
+          if handle.cancelled():
+            continue
+          if self._speedup is not None:
+            delay = wallStart + (when - virtualStart) / self._speedup - time.time()
+            if delay > 0:
+              time.sleep(delay)
+          self._time = max(self._time, when)
+        else:
+          break
+        if not handle.cancelled():
+          self._run(handle)
+    finally:
+      self._running = False
+
+  def stop(self):
+    self._stopping = True
+
+  def is_running(self):
+    return self._running
+
+  def is_closed(self):
+    return self._closed
+
+  def close(self):
+    self._closed = True
+    self._ready.clear()
+    self._timers = []
+
+  def get_debug(self):
+    return self._debug
+
+  def set_debug(self, enabled):
+    self._debug = enabled
+
+  def call_exception_handler(self, context):
+    self._errorCount += 1
+    logging.getLogger(__name__).error(context.get('message', 'Unhandled exception') + "\n" +
+      context.get('traceback', repr(context.get('exception'))))
+
+  def getErrorCount(self):
+    """
+    :return: The number of exceptions raised by callbacks so far
+    """
+    return self._errorCount
+
+  def getPendingCount(self):
+    return len(self._ready) + len(self._timers)
+
+  def _run(self, handle):
+    try:
+      handle._callback(*handle._args)
+    except Exception as e:
+      self.call_exception_handler({
+        'message': 'Exception in callback ' + repr(handle._callback),
+        'exception': e,
+        'traceback': traceback.format_exc()
+      })
+
+class TranslationStub(UrlTranslator):
+  """
+  A UrlTranslator answering from a latency model instead of the translation
+  service: each request takes an exponentially distributed time on the
+  loop's clock and fails with the given probability. Queueing, deadlines
+  and the sharing of concurrent requests are UrlTranslator's own.
+  """
+  def __init__(self, loop, maxConcurrency = 4, meanLatency = 1.0, failureRate = 0.0, seed = None):
+    """
+    :param meanLatency: The mean time a request takes in seconds
+    :param failureRate: The probability that a request fails
+    :param seed: The seed of the latencies and failures, for repeatable runs
+    """
+    UrlTranslator.__init__(self, loop, DRY_RUN_VIDEO_URL, maxConcurrency)
+    self._meanLatency = meanLatency
+    self._failureRate = failureRate
+    self._random = random.Random(seed)
+    self._requestCount = 0
+
+  def getRequestCount(self):
+    return self._requestCount
+
+  def _submit(self, srcUrl):
+    self._requestCount += 1
+    future = self._loop.create_future()
+    latency = self._random.expovariate(1.0 / self._meanLatency) if self._meanLatency > 0 else 0
+    failed = self._random.random() < self._failureRate
+    self._loop.call_later(latency, self._complete, future, srcUrl, failed)
+    return future
+
+  def _complete(self, future, srcUrl, failed):
+    if failed:
+      future.set_exception(IOError("Translation stub failed for " + srcUrl))
+    else:
+      future.set_result(DRY_RUN_VIDEO_URL + urlencode({'url': srcUrl}))
+
+def makeMemoryKeyChain(identityName = "/localhost/edl-dry-run", storages = None):
+  """
+  :param storages: The (MemoryIdentityStorage, MemoryPrivateKeyStorage) to
+    keep the identity in, created in them if missing; new ones if None. Key
+    chains made with the same ones sign as the same identity, e.g. one per thread
+  :return: A KeyChain kept in memory, whose default certificate is that of
+    the identity; nothing is read from or written to the system key storage
+  :rtype: KeyChain
+  """
+  if storages is None:
+    storages = (MemoryIdentityStorage(), MemoryPrivateKeyStorage())
+  identityManager = IdentityManager(storages[0], storages[1])
+  keyChain = KeyChain(identityManager, NoVerifyPolicyManager())
+  if not storages[0].doesIdentityExist(Name(identityName)):
+    keyChain.createIdentityAndCertificate(Name(identityName))
+    identityManager.setDefaultIdentity(Name(identityName))
+  return keyChain
+
+class DryRun(object):
+  """
+  Publishes an EDL with the publisher's own scheduling, translation and
+  publishing code, on a VirtualClockLoop with a LocalFace, a key chain in
+  memory, a TranslationStub and a translation cache in memory, and reports
+  when each event was published against its publishing deadline.
+  """
+  def __init__(self, speedup = None, translationLatency = 1.0, translationFailureRate = 0.0, seed = None,
+               applyEDLAdjustment = False, frameRate = 30, digestSigning = False):
+    """
+    :param speedup: How many times faster than real time to run, or None to
+      run as fast as possible
+    :param translationLatency: The mean latency of the translation stub in seconds
+    :param translationFailureRate: The probability that a translation fails
+    :param seed: The seed of the translation stub
+    """
+    self._loop = VirtualClockLoop(speedup)
+    self._face = LocalFace(self._loop)
+    # The signing thread gets a key chain of its own over the same identity
+    storages = (MemoryIdentityStorage(), MemoryPrivateKeyStorage())
+    self._publisher = NaiveEDLParserAndPublisher(applyEDLAdjustment, frameRate, digestSigning,
+      loop = self._loop, face = self._face, keyChain = makeMemoryKeyChain(storages = storages),
+      translationCachePath = ":memory:", makeKeyChain = functools.partial(makeMemoryKeyChain, storages = storages))
+    self._publisher._urlTranslator = TranslationStub(self._loop, self._publisher._translationConcurrency,
+      translationLatency, translationFailureRate, seed)
+    self._publisher._onPublished = self.onPublished
+    # event id -> publishing time, as scheduled
+    self._deadlines = dict()
+    self._timeline = []
+    self._finished = False
+    self._wallStart = None
+    self._wallSeconds = None
+
+  def getPublisher(self):
+    """
+    :return: The publisher, to load EDL adjustments or change its parameters before run
+    :rtype: NaiveEDLParserAndPublisher
+    """
+    return self._publisher
+
+  def getLoop(self):
+    return self._loop
+
+  def getFace(self):
+    """
+    :return: The LocalFace the events are published on, for consumers to fetch them during the run
+    :rtype: LocalFace
+    """
+    return self._face
+
+  def useClipNamesAsCatalog(self, fileName):
+    """
+    Make up a video for every video clip of an EDL, as there is no video
+    catalog in a dry run; otherwise no clip is found and nothing is translated
+    """
+    videoUrlDict = self._publisher._videoUrlDict
+    for event in iterEvents(fileName, self._publisher._rate):
+      for clipName in event.fromClipNames:
+        title = catalogTitle(clipName)
+        if title is not None and title not in videoUrlDict:
+          videoUrlDict[title] = "dry-run-" + str(len(videoUrlDict))
+    self._publisher._clipNameIndex = None
+
+  def run(self, fileName, startOffset = 0):
+    """
+    Parse and publish an EDL until the end of the cut
+    :param startOffset: The position to start publishing from in seconds
+    :return: The report, see getReport
+    :rtype: dict
+    """
+    publisher = self._publisher
+    publisher.parse(fileName)
+    self._wallStart = time.time()
+    publisher.schedulePublishing(startOffset)
+    self._deadlines = dict((idx, schedule[0]) for idx, schedule in publisher._eventSchedule.items())
+    if publisher._endSchedule is not None:
+      self._deadlines[publisher.END_EVENT_KEY] = publisher._latestEventTime + 1
+    self._loop.run_forever()
+    self._wallSeconds = time.time() - self._wallStart
+    return self.getReport()
+
+  def onPublished(self, seq, event, data):
+    position = self._publisher._scheduler.getPosition()
+    isEnd = event.isEnd and event.srcUrl == "end"
+    deadline = self._deadlines.get(self._publisher.END_EVENT_KEY if isEnd else event.eventId)
+    if event.isEnd:
+      self._finished = self._finished or isEnd
+      dstStartTime = None
+    else:
+      dstStartTime = event.rate.toTimecode(event.dstStart)
+    self._timeline.append(collections.OrderedDict([
+      ('time', round(self._loop.time(), 3)),
+      ('position', round(position, 3)),
+      ('deadline', deadline),
+      ('lateness', None if deadline is None else round(position - deadline, 3)),
+      ('seq', seq),
+      ('event_id', str(event.eventId)),
+      ('name', data.getName().toUri()),
+      ('dst_start_time', dstStartTime),
+      ('translation', _TRANSLATION_OUTCOMES.get(event.translated)),
+      ('src_url', event.srcUrl),
+      ('wall', round(time.time() - self._wallStart, 3))
+    ]))
+
+  def getReport(self):
+    """
+    :return: A dict with the "timeline", one row per publication of an event
+      in the order published, giving the virtual time, the position in the
+      cut, the scheduled publishing time and how late the event was, its
+      sequence number, name and translation outcome, and the real time since
+      the start; and the "summary" of the run
+    :rtype: dict
+    """
+    publisher = self._publisher
+    latenesses = [row['lateness'] for row in self._timeline if row['lateness'] is not None]
+    outcomes = collections.Counter(row['translation'] for row in self._timeline if row['translation'] is not None)
+    virtualSeconds = self._loop.time()
+    summary = collections.OrderedDict([
+      ('published', len(self._timeline)),
+      ('finished', self._finished),
+      ('virtualSeconds', round(virtualSeconds, 3)),
+      ('wallSeconds', None if self._wallSeconds is None else round(self._wallSeconds, 3)),
+      ('speedup', round(virtualSeconds / self._wallSeconds, 1) if self._wallSeconds else None),
+      ('late', sum(1 for lateness in latenesses if lateness > 0)),
+      ('maxLateness', max(latenesses) if latenesses else None),
+      ('translationOutcomes', dict(outcomes)),
+      ('translationRequests', publisher._urlTranslator.getRequestCount()),
+      ('translations', publisher.getTranslationStats()),
+      ('scheduler', publisher._scheduler.getLatenessStats()),
+      ('contentCache', publisher._memoryContentCache.getStats()),
+      ('face', self._face.getStats()),
+      ('errors', self._loop.getErrorCount())
+    ])
+    return {'summary': summary, 'timeline': self._timeline}
+
+def writeReport(report, fileName):
+  """
+  Write a dry run report as JSON, or only its timeline as CSV if fileName ends in ".csv"
+  """
+  if fileName.endswith(".csv"):
+    if sys.version_info[0] < 3:
+      reportFile = open(fileName, "wb")
+    else:
+      reportFile = open(fileName, "w", newline = "")
+    with reportFile:
+      writer = None
+      for row in report['timeline']:
+        if writer is None:
+          writer = csv.DictWriter(reportFile, list(row))
+          writer.writeheader()
+        writer.writerow(row)
+  else:
+    with open(fileName, "w") as reportFile:
+      json.dump(report, reportFile, indent = 2)
+
+def printSummary(summary):
+  print("Published " + str(summary['published']) + " events" +
+    ("" if summary['finished'] else " (the end was not reached)") + " through " +
+    str(summary['virtualSeconds']) + " sec of the cut in " + str(summary['wallSeconds']) + " sec (" +
+    str(summary['speedup']) + "x)")
+  print("Late: " + str(summary['late']) + ", by up to " + str(summary['maxLateness']) + " sec; translations: " +
+    ", ".join(outcome + " " + str(count) for outcome, count in sorted(summary['translationOutcomes'].items())))
+  if summary['errors']:
+    print("Errors in callbacks: " + str(summary['errors']))
+
+def usage():
+  print("Usage: python dry_run.py [-s speedup] [-l translation-latency] [-f translation-failure-rate]\n"
+        "         [-r seed] [-a adjustment.csv] [-o report.json|report.csv] [-n] [-d] file.edl\n"
+        "  -s  Run this many times faster than real time instead of as fast as possible\n"
+        "  -n  Do not make up a video for every clip; no clip is found, as without a catalog\n"
+        "  -d  Sign with SHA-256 digests")
+
+if __name__ == '__main__':
+  try:
+    opts, args = getopt.getopt(sys.argv[1:], "s:l:f:r:a:o:ndh")
+  except getopt.GetoptError as e:
+    print(str(e))
+    usage()
+    sys.exit(2)
+  opts = dict(opts)
+  if "-h" in opts or len(args) != 1:
+    usage()
+    sys.exit(0 if "-h" in opts else 2)
+
+  dryRun = DryRun(float(opts["-s"]) if "-s" in opts else None,
+    float(opts.get("-l", 1.0)), float(opts.get("-f", 0.0)),
+    int(opts["-r"]) if "-r" in opts else None, "-a" in opts, digestSigning = "-d" in opts)
+  if "-a" in opts:
+    dryRun.getPublisher().loadEDLAdjustment(opts["-a"])
+  if "-n" not in opts:
+    dryRun.useClipNamesAsCatalog(args[0])
+  report = dryRun.run(args[0])
+  printSummary(report['summary'])
+  if "-o" in opts:
+    writeReport(report, opts["-o"])
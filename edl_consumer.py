@@ -0,0 +1,231 @@
+import collections
+import functools
+
+from pyndn import Name, Interest
+
+from payload_codec import decodeContent
+
+try:
+  import asyncio
+except ImportError:
+  import trollius as asyncio
+
+try:
+  StopAsyncIteration
+except NameError:
+  # Python 2 has no async for; only __anext__ raises it
+  StopAsyncIteration = StopIteration
+
+class EDLConsumer(object):
+  """
+  Fetches the events an EDL publisher publishes under <prefix><seq-no>, in
+  sequence order, until the "end" packet.
+
+  A window of Interests is kept outstanding for the sequence numbers ahead
+  of the next event to hand over, so that events are already there when
+  playback reaches them. The window grows by about one Interest per round
+  trip while Data arrives and is halved on timeouts, at most once per round
+  trip. Timed out Interests are expressed again, up to maxRetries times;
+  a sequence number given up on is skipped. Events arriving out of order
+  are held back until the ones before them arrived.
+
+  Events are handed to onEvent(seq, event) if given, otherwise queued for
+  getEvent() or "async for event in consumer" (Python 3.5+). Content is
+  decoded with payload_codec, so JSON and binary prefixes both work.
+  """
+  def __init__(self, face, prefix, onEvent = None, onEnd = None, onFailed = None, loop = None,
+               initialWindow = 4, maxWindow = 64, interestLifetime = 4000, maxRetries = None):
+    """
+    :param face: The Face to express Interests on
+    :param prefix: The name prefix URI of the events, ending in "/"
+    :param onEvent: Called as onEvent(seq, event) with each event dict, in order
+    :param onEnd: Called as onEnd() after the "end" packet was handed over
+    :param onFailed: Called as onFailed(seq) for the sequence numbers given up on
+    :param loop: The asyncio (or trollius) event loop; the default loop if None
+    :param initialWindow: The number of Interests outstanding at first
+    :param maxWindow: The largest window, also bounding how far ahead of the
+      next event to hand over Interests are expressed
+    :param interestLifetime: The Interest lifetime in milliseconds
+    :param maxRetries: How many times an Interest is expressed again before
+      its sequence number is given up on, or None to keep trying
+    """
+    self._face = face
+    self._prefix = prefix
+    self._onEvent = onEvent
+    self._onEnd = onEnd
+    self._onFailed = onFailed
+    self._loop = asyncio.get_event_loop() if loop is None else loop
+    self._window = float(initialWindow)
+    self._maxWindow = maxWindow
+    self._interestLifetime = interestLifetime
+    self._maxRetries = maxRetries
+
+    self._running = False
+    self._finished = False
+    # Next sequence number to express an Interest for the first time
+    self._nextSeq = 0
+    # Next sequence number to hand over
+    self._nextDeliver = 0
+    self._endSeq = None
+    # seq -> (pending Interest id, time expressed, retries)
+    self._pending = dict()
+    # seq -> event dict, or None if given up on, for the events not handed over yet
+    self._received = dict()
+    self._lastDecrease = None
+    self._srtt = None
+
+    # Events waiting for getEvent, and getEvent futures waiting for events
+    self._ready = collections.deque()
+    self._waiters = collections.deque()
+
+    self._expressedCount = 0
+    self._dataCount = 0
+    self._timeoutCount = 0
+    self._retransmitCount = 0
+
+  def start(self, startSeq = 0):
+    """
+    Start fetching from startSeq, e.g. the first sequence number not covered
+    by the manifest segments already fetched
+    """
+    self._running = True
+    self._nextSeq = startSeq
+    self._nextDeliver = startSeq
+    self._fill()
+
+  def stop(self):
+    self._running = False
+    for seq in list(self._pending):
+      self._face.removePendingInterest(self._pending.pop(seq)[0])
+
+  def isFinished(self):
+    return self._finished
+
+  def getEvent(self):
+    """
+    :return: A future of the next event dict in sequence order, or of None
+      after the end; only when no onEvent callback is given
+    """
+    future = asyncio.Future(loop = self._loop)
+    if self._ready:
+      future.set_result(self._ready.popleft())
+    elif self._finished:
+      future.set_result(None)
+    else:
+      self._waiters.append(future)
+    return future
+
+  def __aiter__(self):
+    return self
+
+  def __anext__(self):
+    future = asyncio.Future(loop = self._loop)
+    def onEvent(eventFuture):
+      if eventFuture.result() is None:
+        future.set_exception(StopAsyncIteration())
+      else:
+        future.set_result(eventFuture.result())
+    self.getEvent().add_done_callback(onEvent)
+    return future
+
+  def getStats(self):
+    """
+    :return: A dict with the current window, the smoothed round trip time in
+      seconds (None before the first sample), the next sequence number to
+      hand over and the Interest, Data, timeout and retransmission counts
+    """
+    return {
+      'window': self._window,
+      'srtt': self._srtt,
+      'nextSeq': self._nextDeliver,
+      'expressed': self._expressedCount,
+      'data': self._dataCount,
+      'timeouts': self._timeoutCount,
+      'retransmissions': self._retransmitCount
+    }
+
+  def _fill(self):
+    while (self._running and len(self._pending) < int(self._window) and
+           self._nextSeq < self._nextDeliver + self._maxWindow and
+           (self._endSeq is None or self._nextSeq <= self._endSeq)):
+      self._express(self._nextSeq, 0)
+      self._nextSeq += 1
+
+  def _express(self, seq, retries):
+    interest = Interest(Name(self._prefix + str(seq)))
+    interest.setInterestLifetimeMilliseconds(self._interestLifetime)
+    pendingInterestId = self._face.expressInterest(interest,
+      functools.partial(self._onData, seq), functools.partial(self._onTimeout, seq))
+    self._pending[seq] = (pendingInterestId, self._loop.time(), retries)
+    self._expressedCount += 1
+
+  def _onData(self, seq, interest, data):
+    entry = self._pending.pop(seq, None)
+    if entry is None or not self._running:
+      return
+    self._dataCount += 1
+    # Karn's rule: the Data of a retransmitted Interest may answer either one
+    if entry[2] == 0:
+      rtt = self._loop.time() - entry[1]
+      self._srtt = rtt if self._srtt is None else 0.875 * self._srtt + 0.125 * rtt
+    self._window = min(self._maxWindow, self._window + 1.0 / self._window)
+
+    try:
+      event = decodeContent(data.getContent().toBytes())
+    except ValueError as e:
+      print("Warning: cannot decode " + data.getName().toUri() + ": " + str(e))
+      event = None
+    self._received[seq] = event
+    if event is not None and event.get("src_url") == "end":
+      self._setEnd(seq)
+    self._deliver()
+    self._fill()
+
+  def _onTimeout(self, seq, interest):
+    entry = self._pending.pop(seq, None)
+    if entry is None or not self._running:
+      return
+    self._timeoutCount += 1
+    # Timeouts of Interests expressed before the last decrease were already accounted for
+    if self._lastDecrease is None or entry[1] > self._lastDecrease:
+      self._window = max(1.0, self._window / 2)
+      self._lastDecrease = self._loop.time()
+    if self._maxRetries is not None and entry[2] >= self._maxRetries:
+      print("Warning: giving up on " + interest.getName().toUri())
+      self._received[seq] = None
+      self._deliver()
+    else:
+      self._retransmitCount += 1
+      self._express(seq, entry[2] + 1)
+    self._fill()
+
+  def _setEnd(self, seq):
+    self._endSeq = seq
+    for pendingSeq in [pendingSeq for pendingSeq in self._pending if pendingSeq > seq]:
+      self._face.removePendingInterest(self._pending.pop(pendingSeq)[0])
+
+  def _deliver(self):
+    while self._nextDeliver in self._received:
+      seq = self._nextDeliver
+      event = self._received.pop(seq)
+      self._nextDeliver += 1
+      if event is None:
+        if self._onFailed is not None:
+          self._onFailed(seq)
+      elif self._onEvent is not None:
+        self._onEvent(seq, event)
+      elif self._waiters:
+        self._waiters.popleft().set_result(event)
+      else:
+        self._ready.append(event)
+      if self._endSeq is not None and seq >= self._endSeq:
+        self._finish()
+        return
+
+  def _finish(self):
+    self.stop()
+    self._finished = True
+    while self._waiters:
+      self._waiters.popleft().set_result(None)
+    if self._onEnd is not None:
+      self._onEnd()
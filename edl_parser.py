@@ -0,0 +1,382 @@
+import io
+import os
+import re
+import gc
+import mmap
+import multiprocessing
+
+try:
+  import cPickle as pickle
+except ImportError:
+  import pickle
+
+from timecode import FrameRate, parseFCM
+
+# Compiled once; these run against every line of the EDL
+_blankLineRegex = re.compile(r'\s+')
+_fromClipNameRegex = re.compile(r'\* FROM CLIP NAME: ([^\n]*)\n')
+
+DEFAULT_FRAME_RATE = FrameRate(30)
+
+# Smallest chunk handed to a worker process by iterEventsParallel, in bytes
+MIN_CHUNK_SIZE = 1024 * 1024
+# Smaller files are parsed in this process by iterEventsParallel: starting the
+# pool and sending the events back costs more than parsing them in parallel saves
+MIN_PARALLEL_SIZE = 4 * 1024 * 1024
+
+class EDLEvent(object):
+  """
+  A single EDL event. Timecodes are kept as integer frame counts in the
+  event's FrameRate and only turned back into strings by toDict, at publish time.
+  """
+  __slots__ = ('eventId', 'reelName', 'channel', 'trans',
+               'srcStart', 'srcEnd', 'dstStart', 'dstEnd',
+               'srcUrl', 'translated', 'clipName', 'ytPresent',
+               'payload', 'oriUrl', 'fromClipNames', 'srcAdjusted',
+               'rate', 'isEnd')
+
+  def __init__(self, eventId, reelName = None, channel = None, trans = None,
+               srcStart = 0, srcEnd = 0, dstStart = 0, dstEnd = 0,
+               rate = DEFAULT_FRAME_RATE):
+    self.eventId = eventId
+    self.reelName = reelName
+    self.channel = channel
+    self.trans = trans
+    self.srcStart = srcStart
+    self.srcEnd = srcEnd
+    self.dstStart = dstStart
+    self.dstEnd = dstEnd
+    self.srcUrl = "none"
+    self.translated = "none"
+    self.clipName = "n/a"
+    self.ytPresent = "n/a"
+    # Lines following the event line that are not FROM CLIP NAME comments
+    self.payload = None
+    self.oriUrl = None
+    # Raw FROM CLIP NAME values, in file order
+    self.fromClipNames = []
+    self.srcAdjusted = False
+    self.rate = rate
+    self.isEnd = False
+
+  def copy(self):
+    """
+    :return: A copy of the event; the payload and fromClipNames lists are shared
+    :rtype: EDLEvent
+    """
+    event = EDLEvent.__new__(EDLEvent)
+    for slot in EDLEvent.__slots__:
+      setattr(event, slot, getattr(self, slot))
+    return event
+
+  def signature(self):
+    """
+    :return: The parsed content of the event, to tell whether it changed
+      between two versions of an EDL; only meaningful before clip name resolution
+    :rtype: tuple
+    """
+    return (self.reelName, self.channel, self.trans,
+            self.srcStart, self.srcEnd, self.dstStart, self.dstEnd, self.rate,
+            tuple(self.payload or ()), tuple(self.fromClipNames))
+
+  @classmethod
+  def makeEnd(cls, eventId):
+    """
+    :return: The sentinel event published after the last event of the cut
+    :rtype: EDLEvent
+    """
+    event = cls(eventId)
+    event.srcUrl = "end"
+    event.translated = "not-required"
+    event.isEnd = True
+    return event
+
+  @classmethod
+  def makeRemoved(cls, eventId):
+    """
+    :return: The event published in place of an already published event that
+      was removed from the EDL, so that sequence numbers stay consecutive
+    :rtype: EDLEvent
+    """
+    event = cls.makeEnd(eventId)
+    event.srcUrl = "removed"
+    return event
+
+  def toDict(self):
+    """
+    :return: The event in the dict format published to consumers
+    :rtype: dict
+    """
+    if self.isEnd:
+      return {
+        "event_id": str(self.eventId),
+        "src_url": self.srcUrl,
+        "translated": self.translated
+      }
+    result = {
+      "event_id": str(self.eventId),
+      "reel_name": self.reelName,
+      "channel": self.channel,
+      "trans": self.trans,
+      "src_start_time": self.rate.toTimecode(self.srcStart, not self.srcAdjusted),
+      "src_end_time": self.rate.toTimecode(self.srcEnd, not self.srcAdjusted),
+      "dst_start_time": self.rate.toTimecode(self.dstStart),
+      "dst_end_time": self.rate.toTimecode(self.dstEnd),
+      "src_url": self.srcUrl,
+      "translated": self.translated,
+      "clipName": self.clipName,
+      "ytPresent": self.ytPresent
+    }
+    if self.payload is not None:
+      result["payload"] = self.payload
+    if self.oriUrl is not None:
+      result["ori_url"] = self.oriUrl
+    return result
+
+  def __repr__(self):
+    return "EDLEvent(" + str(self.eventId) + ", " + str(self.reelName) + ", " + str(self.fromClipNames) + ")"
+
+def iterEvents(source, rate = DEFAULT_FRAME_RATE):
+  """
+  Lazily parse EDL events from a file name or any iterable of lines.
+  An event is yielded as soon as the blank line ending it (or the end of
+  input) is read, with its trailing lines attached. "FCM:" lines switch
+  between drop-frame and non-drop-frame counting for the events that follow.
+  :param source: A file name, or an iterable yielding lines including their line endings
+  :param rate: The FrameRate of the EDL; EDLs do not record their frame rate
+  :rtype: generator of EDLEvent
+  """
+  if isinstance(source, str):
+    with open(source, 'r') as edlFile:
+      for event in iterEvents(edlFile, rate):
+        yield event
+    return
+
+  isEventBegin = False
+  event = None
+  for line in source:
+    if line.startswith('FCM:'):
+      dropFrame = parseFCM(line)
+      if dropFrame is not None:
+        rate = rate.withFCM(dropFrame)
+    if isEventBegin:
+      components = line.split()
+      if not components:
+        continue
+      try:
+        eventID = int(components[0])
+      except ValueError:
+        print("Cannot cast " + components[0] + " to eventID")
+        continue
+      # We seem to have a fixed number of components here;
+      # reference: http://www.edlmax.com/maxguide.html
+      timeComponentsIdx = len(components) - 4
+      event = EDLEvent(eventID, components[1], components[2], components[3],
+        rate.toFrames(components[timeComponentsIdx]),
+        rate.toFrames(components[timeComponentsIdx + 1]),
+        rate.toFrames(components[timeComponentsIdx + 2]),
+        rate.toFrames(components[timeComponentsIdx + 3]),
+        rate)
+      isEventBegin = False
+    elif _blankLineRegex.match(line) is not None or line == '':
+      if event is not None:
+        yield event
+        event = None
+      isEventBegin = True
+    elif event is not None and event.eventId > 0:
+      fromClipNameMatch = _fromClipNameRegex.match(line)
+      if fromClipNameMatch is not None:
+        event.fromClipNames.append(fromClipNameMatch.group(1).strip())
+      elif event.payload is None:
+        event.payload = [line]
+      else:
+        event.payload.append(line)
+  if event is not None:
+    yield event
+
+def iterEventsParallel(fileName, rate = DEFAULT_FRAME_RATE, processes = None, chunkSize = None):
+  """
+  Parse a large EDL file in a pool of processes, yielding the same events in
+  the same order as iterEvents. The file is memory-mapped and cut into
+  chunks at blank lines, where iterEvents starts every event from the same
+  state; the frame rate each chunk starts with is worked out from the
+  "FCM:" lines before it. Chunks are collected in file order, so events can
+  be consumed while later chunks are still being parsed.
+  :param fileName: The EDL file
+  :param rate: The FrameRate of the EDL
+  :param processes: The number of worker processes, the number of CPUs by default
+  :param chunkSize: The approximate size of a chunk in bytes; if not given,
+    files under MIN_PARALLEL_SIZE are parsed serially
+  :rtype: generator of EDLEvent
+  """
+  if processes is None:
+    processes = multiprocessing.cpu_count()
+  with open(fileName, 'rb') as edlFile:
+    size = os.fstat(edlFile.fileno()).st_size
+    if size == 0:
+      return
+    chunks = []
+    if processes > 1 and (chunkSize is not None or size >= MIN_PARALLEL_SIZE):
+      if chunkSize is None:
+        # A few chunks per process, so that a slow chunk does not hold up the others
+        chunkSize = max(MIN_CHUNK_SIZE, size // (processes * 4) + 1)
+      edlMap = mmap.mmap(edlFile.fileno(), 0, access = mmap.ACCESS_READ)
+      try:
+        chunks = _findChunks(edlMap, rate, chunkSize)
+      finally:
+        edlMap.close()
+
+  if len(chunks) < 2:
+    for event in iterEvents(fileName, rate):
+      yield event
+    return
+  pool = multiprocessing.Pool(min(processes, len(chunks)))
+  try:
+    for rows in pool.imap(_parseChunk, [(fileName, start, end, chunkRate) for start, end, chunkRate in chunks]):
+      for event in _eventsFromRows(rows):
+        yield event
+  finally:
+    pool.terminate()
+    pool.join()
+
+def _findChunks(edlMap, rate, chunkSize):
+  """
+  :return: [(start, end, rate)] of chunks starting at blank lines, with the
+    frame rate in effect at their start
+  """
+  size = len(edlMap)
+  starts = [0]
+  position = chunkSize
+  while position < size:
+    lineStart = edlMap.find(b'\n', position) + 1
+    if lineStart <= 0 or lineStart >= size:
+      break
+    lineEnd = edlMap.find(b'\n', lineStart)
+    if lineEnd < 0:
+      break
+    # Only whitespace-only lines: after a blank line, iterEvents reads a
+    # line merely starting with whitespace as an event line
+    if edlMap[lineStart:lineEnd + 1].strip() == b'':
+      starts.append(lineStart)
+      position = lineStart + chunkSize
+    else:
+      position = lineStart
+
+  chunks = []
+  fcmPosition = edlMap.find(b'FCM:')
+  for idx, start in enumerate(starts):
+    while 0 <= fcmPosition < start:
+      if fcmPosition == 0 or edlMap[fcmPosition - 1:fcmPosition] in b'\r\n':
+        lineEnd = edlMap.find(b'\n', fcmPosition)
+        dropFrame = parseFCM(edlMap[fcmPosition:lineEnd if lineEnd >= 0 else size].decode('ascii', 'replace'))
+        if dropFrame is not None:
+          rate = rate.withFCM(dropFrame)
+      fcmPosition = edlMap.find(b'FCM:', fcmPosition + 1)
+    chunks.append((start, starts[idx + 1] if idx + 1 < len(starts) else size, rate))
+  return chunks
+
+def _parseChunk(args):
+  fileName, start, end, rate = args
+  with open(fileName, 'rb') as edlFile:
+    edlMap = mmap.mmap(edlFile.fileno(), 0, access = mmap.ACCESS_READ)
+    try:
+      chunk = edlMap[start:end]
+    finally:
+      edlMap.close()
+  if bytes is str:
+    # Python 2 reads EDLs as byte strings
+    lines = io.BytesIO(chunk)
+  else:
+    # Decoded with universal newlines, as open(fileName, 'r') does
+    lines = io.TextIOWrapper(io.BytesIO(chunk))
+  # Sent back as plain tuples: much cheaper to unpickle than EDLEvents
+  rows = [(event.eventId, event.reelName, event.channel, event.trans,
+           event.srcStart, event.srcEnd, event.dstStart, event.dstEnd, event.rate,
+           event.payload, event.fromClipNames) for event in iterEvents(lines, rate)]
+  return pickle.dumps(rows, pickle.HIGHEST_PROTOCOL)
+
+def _eventsFromRows(rows):
+  # Building hundreds of thousands of objects at once otherwise triggers
+  # the cyclic garbage collector over and over
+  gcEnabled = gc.isenabled()
+  gc.disable()
+  try:
+    events = []
+    for row in pickle.loads(rows):
+      event = EDLEvent(*row[:9])
+      event.payload = row[9]
+      event.fromClipNames = row[10]
+      events.append(event)
+  finally:
+    if gcEnabled:
+      gc.enable()
+  return events
+
+class IncrementalEDLParser(object):
+  """
+  Parses successive versions of an EDL, re-parsing only the blocks that
+  changed. A block runs from a whitespace-only line to the next one; iterEvents
+  starts every block from the same state, apart from the frame rate set
+  by earlier "FCM:" lines, so a block parsed alone gives the same events
+  as in the whole file.
+
+  The events returned are shared with the cache and must not be modified;
+  use EDLEvent.copy.
+  """
+  def __init__(self, rate = DEFAULT_FRAME_RATE):
+    self._rate = rate
+    # (block text, frame rate) -> events of the block, for the latest version only
+    self._blocks = dict()
+
+  def parse(self, lines):
+    """
+    :param lines: The lines of the EDL, including their line endings
+    :return: (events, parsedBlocks): a dict of event id -> EDLEvent and the
+      number of blocks that had to be parsed
+    """
+    events = dict()
+    blocks = dict()
+    parsedBlocks = 0
+    rate = self._rate
+    for blockLines in _splitBlocks(lines):
+      key = ("".join(blockLines), rate)
+      if key in self._blocks:
+        blockEvents = self._blocks[key]
+      else:
+        blockEvents = list(iterEvents(blockLines, rate))
+        parsedBlocks += 1
+      blocks[key] = blockEvents
+      for event in blockEvents:
+        events[event.eventId] = event
+      for line in blockLines:
+        if line.startswith('FCM:'):
+          dropFrame = parseFCM(line)
+          if dropFrame is not None:
+            rate = rate.withFCM(dropFrame)
+    self._blocks = blocks
+    return events, parsedBlocks
+
+def _splitBlocks(lines):
+  block = []
+  for line in lines:
+    # Only at whitespace-only lines, as _findChunks: after a blank line,
+    # iterEvents reads a line merely starting with whitespace as an event line
+    if block and line.strip() == '':
+      yield block
+      block = []
+    block.append(line)
+  if block:
+    yield block
+
+def diffEvents(oldEvents, newEvents):
+  """
+  Compare two versions of an EDL's events by id and content
+  :param oldEvents: A dict of event id -> EDLEvent, before clip name resolution
+  :param newEvents: A dict of event id -> EDLEvent, before clip name resolution
+  :return: (added, modified, removed) sorted lists of event ids
+  """
+  added = sorted(eventId for eventId in newEvents if eventId not in oldEvents)
+  removed = sorted(eventId for eventId in oldEvents if eventId not in newEvents)
+  modified = sorted(eventId for eventId in newEvents
+    if eventId in oldEvents and newEvents[eventId].signature() != oldEvents[eventId].signature())
+  return added, modified, removed
@@ -0,0 +1,54 @@
+import os
+
+class EDLFileWatcher(object):
+  """
+  Polls an EDL file on the event loop and calls onChanged(lines) once a
+  change has settled, i.e. the file's modification time and size stayed
+  the same for one polling interval, so half-written exports are not read.
+  """
+  def __init__(self, loop, path, onChanged, interval = 1.0):
+    """
+    :param loop: The asyncio (or trollius) event loop
+    :param path: The EDL file
+    :param onChanged: Called as onChanged(lines) with the new content
+    :param interval: The polling interval in seconds
+    """
+    self._loop = loop
+    self._path = path
+    self._onChanged = onChanged
+    self._interval = interval
+    self._lastStat = self._stat()
+    self._changedStat = None
+    self._timer = None
+
+  def start(self):
+    if self._timer is None:
+      self._timer = self._loop.call_later(self._interval, self._poll)
+
+  def stop(self):
+    if self._timer is not None:
+      self._timer.cancel()
+      self._timer = None
+
+  def _stat(self):
+    try:
+      stat = os.stat(self._path)
+    except OSError:
+      return None
+    return (stat.st_mtime, stat.st_size)
+
+  def _poll(self):
+    self._timer = self._loop.call_later(self._interval, self._poll)
+    stat = self._stat()
+    if stat is None or stat == self._lastStat:
+      self._changedStat = None
+      return
+    if stat != self._changedStat:
+      # Still being written; wait until it settles
+      self._changedStat = stat
+      return
+    self._lastStat = stat
+    self._changedStat = None
+    with open(self._path, 'r') as edlFile:
+      lines = edlFile.readlines()
+    self._onChanged(lines)
@@ -0,0 +1,174 @@
+import heapq
+import collections
+
+class EventScheduler(object):
+  """
+  Runs callbacks at deadlines on a timeline measured in seconds from the
+  start of the cut. Entries are kept in the scheduler's own heap and only
+  the earliest one has a timer armed on the event loop, so the loop holds a
+  single timer whatever the length of the playlist.
+
+  The timeline can be started at an offset, paused, resumed and moved with
+  seek. Every entry has an anchor, the timeline position it belongs to
+  (its deadline unless given): seeking to a position drops the entries
+  anchored before it and runs the entries anchored at or after it whose
+  deadline has already passed right away. Entries dropped by a seek come
+  back when seeking back before them; entries that ran or were cancelled
+  are forgotten.
+  """
+  # Entries due within this many seconds of each other run from the same timer
+  GRANULARITY = 0.001
+
+  def __init__(self, loop, latencySamples = 1000):
+    """
+    :param loop: The asyncio (or trollius) event loop
+    :param latencySamples: The number of recent lateness values kept
+    """
+    self._loop = loop
+    # handle -> entry of the entries that have not run and were not cancelled, so
+    # that seeking backwards can bring back the entries a seek dropped
+    self._entries = dict()
+    # Heap of the entries to run; entries no longer in self._entries are skipped
+    self._pending = []
+    self._sequence = 0
+    self._timer = None
+    self._running = False
+    # Timeline position at loop time self._loopTimeAtPosition
+    self._position = 0.0
+    self._loopTimeAtPosition = None
+    # Entries due before this position were caught up with, not late
+    self._jumpPosition = 0.0
+
+    self._latenessCount = 0
+    self._latenessTotal = 0.0
+    self._latenessMax = 0.0
+    self._recentLateness = collections.deque(maxlen = latencySamples)
+
+  def schedule(self, deadline, callback, args = (), anchor = None, trackLateness = True):
+    """
+    Run callback(*args) when the timeline reaches deadline
+    :param deadline: The timeline position in seconds
+    :param anchor: The timeline position the entry belongs to for seek; defaults to deadline
+    :param trackLateness: Whether the entry counts in getLatenessStats
+    :return: A handle for cancel
+    """
+    entry = (deadline, self._sequence, deadline if anchor is None else anchor, callback, args, trackLateness)
+    self._sequence += 1
+    self._entries[entry[1]] = entry
+    if entry[2] >= self._jumpPosition:
+      heapq.heappush(self._pending, entry)
+      if self._running and self._pending[0] is entry:
+        self._arm()
+    return entry[1]
+
+  def cancel(self, handle):
+    """
+    Remove an entry; it will not run, even after seeking back
+    """
+    if self._entries.pop(handle, None) is None:
+      return
+    # Cancelled entries are skipped when they come up, unless they pile up in the heap
+    if len(self._pending) > 2 * len(self._entries) + 64:
+      self._pending = [entry for entry in self._pending if entry[1] in self._entries]
+      heapq.heapify(self._pending)
+
+  def start(self, position = 0.0):
+    """
+    Start the timeline at position; entries anchored before it are skipped
+    """
+    self._running = True
+    self.seek(position)
+
+  def pause(self):
+    if not self._running:
+      return
+    self._position = self.getPosition()
+    self._running = False
+    self._disarm()
+
+  def resume(self):
+    if self._running:
+      return
+    self._running = True
+    self._loopTimeAtPosition = self._loop.time()
+    self._arm()
+
+  def seek(self, position):
+    """
+    Move the timeline to position, keeping the paused or running state
+    """
+    self._disarm()
+    self._position = float(position)
+    self._loopTimeAtPosition = self._loop.time()
+    self._jumpPosition = self._position
+    self._pending = [entry for entry in self._entries.values() if entry[2] >= self._position]
+    heapq.heapify(self._pending)
+    if self._running:
+      self._arm()
+
+  def getPosition(self):
+    """
+    :return: The current timeline position in seconds
+    """
+    if not self._running or self._loopTimeAtPosition is None:
+      return self._position
+    return self._position + (self._loop.time() - self._loopTimeAtPosition)
+
+  def getLateness(self, deadline):
+    """
+    :return: How far the timeline is past deadline, or None if an entry due
+      then was caught up with after a seek rather than late
+    """
+    if deadline < self._jumpPosition:
+      return None
+    return max(0.0, self.getPosition() - deadline)
+
+  def isRunning(self):
+    return self._running
+
+  def getPendingCount(self):
+    return sum(1 for entry in self._pending if entry[1] in self._entries)
+
+  def getLatenessStats(self):
+    """
+    :return: A dict with the count, mean, max and recent values (in seconds)
+      of how late entries ran compared to their deadline
+    """
+    return {
+      'count': self._latenessCount,
+      'mean': self._latenessTotal / self._latenessCount if self._latenessCount else 0.0,
+      'max': self._latenessMax,
+      'recent': list(self._recentLateness)
+    }
+
+  def _arm(self):
+    self._disarm()
+    while self._pending and self._pending[0][1] not in self._entries:
+      heapq.heappop(self._pending)
+    if not self._pending:
+      return
+    deadline = self._pending[0][0]
+    self._timer = self._loop.call_at(self._loopTimeAtPosition + deadline - self._position, self._onTimer)
+
+  def _disarm(self):
+    if self._timer is not None:
+      self._timer.cancel()
+      self._timer = None
+
+  def _onTimer(self):
+    self._timer = None
+    position = self.getPosition()
+    while self._running and self._pending and self._pending[0][0] <= position + self.GRANULARITY:
+      deadline, handle, _, callback, args, trackLateness = heapq.heappop(self._pending)
+      if self._entries.pop(handle, None) is None:
+        continue
+      if trackLateness and deadline >= self._jumpPosition:
+        lateness = max(0.0, position - deadline)
+        self._latenessCount += 1
+        self._latenessTotal += lateness
+        self._latenessMax = max(self._latenessMax, lateness)
+        self._recentLateness.append(lateness)
+      callback(*args)
+      position = self.getPosition()
+    if self._running and self._timer is None:
+      self._arm()
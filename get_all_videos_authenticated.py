@@ -6,10 +6,13 @@ import os
 import sys
 
 from apiclient.discovery import build
+from apiclient.errors import HttpError
 from oauth2client.client import flow_from_clientsecrets
 from oauth2client.file import Storage
 from oauth2client.tools import argparser, run_flow
 
+from channel_index import ChannelIndex
+
 
 # The CLIENT_SECRETS_FILE variable specifies the name of a file that contains
 # the OAuth 2.0 information for this application, including its client_id and
@@ -50,23 +53,22 @@ YOUTUBE_API_VERSION = "v3"
 # For testing if the OAuth redirect url is set up correctly:
 #  https://accounts.google.com/AccountChooser?continue=https%3A%2F%2Faccounts.google.com%2Fo%2Foauth2%2Fauth%3Faccess_type%3Doffline%26scope%3Dhttps%3A%2F%2Fwww.googleapis.com%2Fauth%2Fanalytics.readonly%26response_type%3Dcode%26redirect_uri%3Dhttp%3A%2F%2Flocalhost%3A8080%2F%26client_id%3D402991078443-m4viuofsqb1s61e05bbvi8ejbja46fvj.apps.googleusercontent.com%26hl%3Dzh-CN%26from_login%3D1%26as%3D-2510b106115fceb7&btmpl=authsub&hl=zh_CN
 
-# Realistically, we need to load the videos from other guys channels (that we manage, meaning we need a *-oauth2.json for each of their channel),
-# and match the descriptions of their videos with the descriptions of clips in our EDL; (essentially, the "from clip name" field implies a set of tags/descriptions, instead of a specific video name)
-def getAllVideosFromChannel():
+def getAuthenticatedService(credentialsFile = None):
   flow = flow_from_clientsecrets(CLIENT_SECRETS_FILE,
     message=MISSING_CLIENT_SECRETS_MESSAGE,
     scope=YOUTUBE_READONLY_SCOPE)
 
-  storage = Storage("%s-oauth2.json" % sys.argv[0])
+  storage = Storage(credentialsFile or "%s-oauth2.json" % sys.argv[0])
   credentials = storage.get()
 
   if credentials is None or credentials.invalid:
     flags = argparser.parse_args()
     credentials = run_flow(flow, storage, flags)
 
-  youtube = build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION,
+  return build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION,
     http=credentials.authorize(httplib2.Http()))
 
+def getUploadsPlaylistId(youtube):
   # Retrieve the contentDetails part of the channel resource for the
   # authenticated user's channel.
   channels_response = youtube.channels().list(
@@ -77,37 +79,47 @@ def getAllVideosFromChannel():
   for channel in channels_response["items"]:
     # From the API response, extract the playlist ID that identifies the list
     # of videos uploaded to the authenticated user's channel.
-    uploads_list_id = channel["contentDetails"]["relatedPlaylists"]["uploads"]
-
-    if __debug__:
-      print "Videos in list %s" % uploads_list_id
-
-    # Retrieve the list of videos uploaded to the authenticated user's channel.
-    playlistitems_list_request = youtube.playlistItems().list(
-      playlistId=uploads_list_id,
-      part="snippet",
-      maxResults=50
-    )
-    
-    result = dict()
-
-    while playlistitems_list_request:
+    return channel["contentDetails"]["relatedPlaylists"]["uploads"]
+
+# Page fetcher for channel_index.ChannelIndex: one page of 50 uploads, newest first,
+# or None if etag is given and the page has not changed
+def makeUploadsPageFetcher(youtube, uploads_list_id):
+  def fetchPage(pageToken, etag):
+    options = dict(playlistId=uploads_list_id, part="snippet", maxResults=50)
+    if pageToken is not None:
+      options["pageToken"] = pageToken
+    playlistitems_list_request = youtube.playlistItems().list(**options)
+    if etag is not None:
+      playlistitems_list_request.headers["If-None-Match"] = etag
+    try:
       playlistitems_list_response = playlistitems_list_request.execute()
+    except HttpError as e:
+      if e.resp.status == 304:
+        return None
+      raise
+
+    items = []
+    for playlist_item in playlistitems_list_response["items"]:
+      title = playlist_item["snippet"]["title"]
+      video_id = playlist_item["snippet"]["resourceId"]["videoId"]
+      items.append((title, video_id))
+    return (items, playlistitems_list_response.get("nextPageToken"), playlistitems_list_response.get("etag"))
+  return fetchPage
 
-      # Print information about each video.
-      for playlist_item in playlistitems_list_response["items"]:
-        title = playlist_item["snippet"]["title"]
-        video_id = playlist_item["snippet"]["resourceId"]["videoId"]
-        if __debug__:
-          print "%s (%s)" % (title, video_id)
-        result[title] = video_id
-
-      playlistitems_list_request = youtube.playlistItems().list_next(
-        playlistitems_list_request, playlistitems_list_response)
-
-    if __debug__:
-      print
-    return result
+# Realistically, we need to load the videos from other guys channels (that we manage, meaning we need a *-oauth2.json for each of their channel),
+# and match the descriptions of their videos with the descriptions of clips in our EDL; (essentially, the "from clip name" field implies a set of tags/descriptions, instead of a specific video name)
+def getAllVideosFromChannel(indexFile = None, credentialsFile = None):
+  youtube = getAuthenticatedService(credentialsFile)
+  uploads_list_id = getUploadsPlaylistId(youtube)
+  if __debug__:
+    print("Videos in list %s" % uploads_list_id)
+
+  # Only uploads added since the last run are listed; see ChannelIndex
+  index = ChannelIndex(indexFile or "channel-index-%s.json" % uploads_list_id)
+  newVideos = index.refresh(makeUploadsPageFetcher(youtube, uploads_list_id))
+  if __debug__:
+    print("%d new videos, %d in index" % (newVideos, len(index)))
+  return index.getTitles()
 
 if __name__ == '__main__':
   print(getAllVideosFromChannel())
@@ -0,0 +1,93 @@
+import collections
+import math
+
+class LeadTimeEstimator(object):
+  """
+  Chooses how long before its publishing deadline the translation of an
+  event starts, from the latencies of recent translations: a high
+  percentile of them times a safety factor, kept within bounds. Until
+  minSamples latencies were observed, the default lead time is used.
+
+  Also counts the events whose translation was done by their publishing
+  deadline and the ones that missed it.
+  """
+  def __init__(self, defaultLeadTime = 57, minLeadTime = 2, maxLeadTime = 120,
+               percentile = 95, safetyFactor = 2.0, minSamples = 10, samples = 200):
+    """
+    :param defaultLeadTime: The lead time in seconds before enough latencies were observed
+    :param minLeadTime: The shortest lead time in seconds
+    :param maxLeadTime: The longest lead time in seconds
+    :param percentile: The percentile of the recent latencies the lead time is based on
+    :param safetyFactor: What the percentile is multiplied by
+    :param minSamples: The number of latencies needed before they are used
+    :param samples: The number of recent latencies kept
+    """
+    self._defaultLeadTime = defaultLeadTime
+    self._minLeadTime = minLeadTime
+    self._maxLeadTime = maxLeadTime
+    self._percentile = percentile
+    self._safetyFactor = safetyFactor
+    self._minSamples = minSamples
+    self._latencies = collections.deque(maxlen = samples)
+    self._onTimeCount = 0
+    self._missedCount = 0
+
+  def record(self, latency):
+    """
+    :param latency: The time a translation took in seconds, from its request to its result
+    """
+    self._latencies.append(latency)
+
+  def getPercentile(self, percentile):
+    """
+    :return: The given percentile of the recent latencies (nearest rank), or None without any
+    """
+    if not self._latencies:
+      return None
+    latencies = sorted(self._latencies)
+    rank = int(math.ceil(percentile / 100.0 * len(latencies)))
+    return latencies[min(len(latencies), max(1, rank)) - 1]
+
+  def getLeadTime(self):
+    """
+    :return: How many seconds before its publishing deadline a translation should start
+    """
+    if len(self._latencies) < self._minSamples:
+      return self._defaultLeadTime
+    leadTime = self.getPercentile(self._percentile) * self._safetyFactor
+    return min(self._maxLeadTime, max(self._minLeadTime, leadTime))
+
+  def getMaxLeadTime(self):
+    return max(self._maxLeadTime, self._defaultLeadTime)
+
+  def recordDeadline(self, missed):
+    """
+    :param missed: Whether the translation of a published event missed its publishing deadline
+    """
+    if missed:
+      self._missedCount += 1
+    else:
+      self._onTimeCount += 1
+
+  def getMissFraction(self):
+    """
+    :return: The fraction of events whose translation missed the publishing deadline
+    """
+    total = self._onTimeCount + self._missedCount
+    return float(self._missedCount) / total if total else 0.0
+
+  def getStats(self):
+    """
+    :return: A dict with the number of latencies kept, their median and
+      95th percentile, the current lead time, and the on time and missed
+      counts and the miss fraction
+    """
+    return {
+      'samples': len(self._latencies),
+      'p50': self.getPercentile(50),
+      'p95': self.getPercentile(95),
+      'leadTime': self.getLeadTime(),
+      'onTime': self._onTimeCount,
+      'missed': self._missedCount,
+      'missFraction': self.getMissFraction()
+    }
@@ -0,0 +1,106 @@
+from pyndn import Interest
+
+# Used for Interests without a lifetime, as by NFD
+DEFAULT_INTEREST_LIFETIME = 4000
+
+class LocalFace(object):
+  """
+  An in-process stand-in for ThreadsafeFace, connecting the producers and
+  consumers of one process through the event loop without a forwarder.
+  An Interest is handed to the onInterest of the longest registered prefix
+  matching it, and Data put on the face satisfies the pending Interests it
+  matches; Interests left unanswered time out after their lifetime.
+
+  For tests and dry runs; command signing and registration always succeed.
+  """
+  def __init__(self, loop):
+    """
+    :param loop: The asyncio (or trollius) event loop
+    """
+    self._loop = loop
+    # registered prefix id -> (prefix, onInterest)
+    self._registrations = dict()
+    # pending Interest id -> (interest, onData, onTimeout, timer)
+    self._pendingInterests = dict()
+    self._lastId = 0
+    self._interestCount = 0
+    self._dataCount = 0
+
+  def setCommandSigningInfo(self, keyChain, certificateName):
+    pass
+
+  def registerPrefix(self, prefix, onInterest, onRegisterFailed, onRegisterSuccess = None):
+    """
+    :return: The registered prefix id
+    """
+    self._lastId += 1
+    self._registrations[self._lastId] = (prefix, onInterest)
+    if onRegisterSuccess is not None:
+      self._loop.call_soon(onRegisterSuccess, prefix, self._lastId)
+    return self._lastId
+
+  def removeRegisteredPrefix(self, registeredPrefixId):
+    self._registrations.pop(registeredPrefixId, None)
+
+  def expressInterest(self, interestOrName, onData, onTimeout = None, onNetworkNack = None):
+    """
+    :param interestOrName: An Interest, or a Name to make one of
+    :return: The pending Interest id, for removePendingInterest
+    """
+    if isinstance(interestOrName, Interest):
+      interest = interestOrName
+    else:
+      interest = Interest(interestOrName)
+    self._lastId += 1
+    lifetime = interest.getInterestLifetimeMilliseconds()
+    if lifetime is None or lifetime < 0:
+      lifetime = DEFAULT_INTEREST_LIFETIME
+    timer = self._loop.call_later(lifetime / 1000.0, self._onTimeout, self._lastId)
+    self._pendingInterests[self._lastId] = (interest, onData, onTimeout, timer)
+    self._interestCount += 1
+    self._loop.call_soon(self._forward, interest)
+    return self._lastId
+
+  def removePendingInterest(self, pendingInterestId):
+    entry = self._pendingInterests.pop(pendingInterestId, None)
+    if entry is not None:
+      entry[3].cancel()
+
+  def putData(self, data):
+    self._dataCount += 1
+    for pendingInterestId, (interest, onData, _, timer) in list(self._pendingInterests.items()):
+      if interest.matchesName(data.getName()):
+        del self._pendingInterests[pendingInterestId]
+        timer.cancel()
+        self._loop.call_soon(onData, interest, data)
+
+  def getPendingInterestCount(self):
+    return len(self._pendingInterests)
+
+  def getStats(self):
+    """
+    :return: A dict with the numbers of Interests expressed, Data put and Interests pending
+    """
+    return {
+      'interests': self._interestCount,
+      'data': self._dataCount,
+      'pending': len(self._pendingInterests)
+    }
+
+  def shutdown(self):
+    for pendingInterestId in list(self._pendingInterests):
+      self.removePendingInterest(pendingInterestId)
+    self._registrations.clear()
+
+  def _forward(self, interest):
+    best = None
+    for registeredPrefixId, (prefix, onInterest) in self._registrations.items():
+      if prefix.match(interest.getName()) and (best is None or prefix.size() > best[1].size()):
+        best = (registeredPrefixId, prefix, onInterest)
+    if best is not None:
+      best[2](best[1], interest, self, best[0], None)
+
+  def _onTimeout(self, pendingInterestId):
+    entry = self._pendingInterests.pop(pendingInterestId, None)
+    if entry is not None and entry[2] is not None:
+      entry[2](entry[0])
@@ -0,0 +1,121 @@
+import json
+import hashlib
+import zlib
+
+# Bytes of the SHA-1 digest of a record kept per sequence number of a sealed segment
+_DIGEST_SIZE = 8
+_NO_DIGEST = b'\0' * _DIGEST_SIZE
+
+def _digest(record):
+  return hashlib.sha1(json.dumps(record, sort_keys = True).encode('utf-8')).digest()[:_DIGEST_SIZE]
+
+class ManifestBuilder(object):
+  """
+  Groups the published event records into manifest segments of
+  segmentSize consecutive sequence numbers, so that a consumer joining late
+  or rewinding fetches a handful of segments instead of every event.
+
+  A segment lists the records published so far in its range, as published,
+  under their sequence numbers. Segments whose records changed since they
+  were last taken are reported by takeDirtySegments, to be published again.
+  Once the end of the cut is published, the last segment carries its own
+  number as the final segment number, as does any segment published again
+  after that.
+
+  A complete segment is sealed once encoded: its records are dropped, and
+  only its compressed content and a short digest per record are kept. A
+  record of a sealed segment that changes unseals it.
+  """
+  def __init__(self, segmentSize = 50):
+    """
+    :param segmentSize: The number of sequence numbers covered by a segment
+    """
+    self._segmentSize = segmentSize
+    # segment -> {seq -> record} of the segments not sealed
+    self._segments = dict()
+    # segment -> (compressed content, digests of the records in order of sequence number)
+    self._sealed = dict()
+    self._dirty = set()
+    self._finalSegment = None
+    self._lastSeq = -1
+
+  def update(self, seq, record):
+    """
+    Add or replace the record published under seq
+    :param record: The event as the dict published
+    :return: The segment covering seq
+    """
+    segment = seq // self._segmentSize
+    self._lastSeq = max(self._lastSeq, seq)
+    if segment in self._sealed:
+      offset = (seq - segment * self._segmentSize) * _DIGEST_SIZE
+      if self._sealed[segment][1][offset:offset + _DIGEST_SIZE] == _digest(record):
+        return segment
+      self._unseal(segment)
+    self._segments.setdefault(segment, dict())[seq] = record
+    self._dirty.add(segment)
+    return segment
+
+  def setFinalSeq(self, seq):
+    """
+    Mark seq, the sequence number of the end packet, as the last one; only
+    the last segment is reported dirty, to carry the final segment number
+    """
+    self._finalSegment = seq // self._segmentSize
+    if self._finalSegment in self._sealed:
+      self._unseal(self._finalSegment)
+    self._dirty.add(self._finalSegment)
+
+  def getFinalSegment(self):
+    """
+    :return: The number of the last segment, or None before the end of the cut
+    """
+    return self._finalSegment
+
+  def takeDirtySegments(self):
+    """
+    :return: The sorted segments updated since the last call
+    :rtype: list
+    """
+    dirty = sorted(self._dirty)
+    self._dirty = set()
+    return dirty
+
+  def encodeSegment(self, segment):
+    """
+    Encode a segment, and seal it if no record can be added to it any more
+    :return: The JSON content of a segment: its number, the range of sequence
+      numbers it covers, the final segment number once known and the records
+      published so far in order of sequence number
+    :rtype: str
+    """
+    if segment in self._sealed:
+      return zlib.decompress(self._sealed[segment][0]).decode('utf-8')
+    records = self._segments.get(segment, dict())
+    content = {
+      "segment": segment,
+      "first_seq": segment * self._segmentSize,
+      "last_seq": (segment + 1) * self._segmentSize - 1,
+      "events": [dict(record, seq = seq) for seq, record in sorted(records.items())]
+    }
+    if self._finalSegment is not None:
+      content["final_segment"] = self._finalSegment
+    encoded = json.dumps(content)
+    if segment in self._segments and segment not in self._dirty and (
+        self._lastSeq >= content["last_seq"] or segment == self._finalSegment):
+      digests = [_NO_DIGEST] * self._segmentSize
+      for seq, record in records.items():
+        digests[seq - content["first_seq"]] = _digest(record)
+      self._sealed[segment] = (zlib.compress(encoded.encode('utf-8')), b''.join(digests))
+      del self._segments[segment]
+    return encoded
+
+  def _unseal(self, segment):
+    content = json.loads(zlib.decompress(self._sealed.pop(segment)[0]).decode('utf-8'))
+    records = dict()
+    for record in content["events"]:
+      records[record.pop("seq")] = record
+    self._segments[segment] = records
+
+  def __len__(self):
+    return len(self._segments) + len(self._sealed)
@@ -0,0 +1,292 @@
+import bisect
+import cProfile
+import collections
+import functools
+import json
+import os
+import threading
+import time
+
+try:
+  from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+  from http.server import BaseHTTPRequestHandler, HTTPServer
+
+def exponentialBounds(start, factor, count):
+  """
+  :return: count bucket bounds, from start growing by factor
+  :rtype: list
+  """
+  return [start * factor ** i for i in range(count)]
+
+class Histogram(object):
+  """
+  Counts values into fixed buckets, cheaply enough to record every
+  translation, packet or loop tick. Percentiles are estimated as the upper
+  bound of the bucket they fall in (the largest value for the last bucket).
+  Values may be recorded from several threads.
+  """
+  def __init__(self, bounds):
+    """
+    :param bounds: The sorted upper bounds of the buckets; a last bucket
+      holds the values above them
+    """
+    self._bounds = list(bounds)
+    self._counts = [0] * (len(self._bounds) + 1)
+    self._count = 0
+    self._sum = 0.0
+    self._min = None
+    self._max = None
+    self._lock = threading.Lock()
+
+  def record(self, value):
+    idx = bisect.bisect_left(self._bounds, value)
+    with self._lock:
+      self._counts[idx] += 1
+      self._count += 1
+      self._sum += value
+      if self._max is None or value > self._max:
+        self._max = value
+      if self._min is None or value < self._min:
+        self._min = value
+
+  def getPercentile(self, percentile):
+    """
+    :return: The estimated percentile of the values, or None without any
+    """
+    with self._lock:
+      if self._count == 0:
+        return None
+      rank = percentile / 100.0 * self._count
+      seen = 0
+      for idx, count in enumerate(self._counts):
+        seen += count
+        if seen >= rank and count > 0:
+          return min(self._bounds[idx], self._max) if idx < len(self._bounds) else self._max
+      return self._max
+
+  def getStats(self):
+    """
+    :return: A dict with the count, mean, min, max and estimated median, 95th
+      and 99th percentile of the values, and the bucket counts by upper bound
+    """
+    with self._lock:
+      buckets = collections.OrderedDict(
+        (str(bound), count) for bound, count in zip(self._bounds + ["+Inf"], self._counts))
+      count, total, minimum, maximum = self._count, self._sum, self._min, self._max
+    return collections.OrderedDict([
+      ('count', count),
+      ('mean', total / count if count else None),
+      ('min', minimum),
+      ('max', maximum),
+      ('p50', self.getPercentile(50)),
+      ('p95', self.getPercentile(95)),
+      ('p99', self.getPercentile(99)),
+      ('buckets', buckets)
+    ])
+
+class RateMeter(object):
+  """
+  Counts occurrences, and their rate over the last window seconds, in one
+  counter per second
+  """
+  def __init__(self, clock = time.time, window = 60):
+    """
+    :param clock: The function giving the current time in seconds, e.g. loop.time
+    :param window: The number of seconds the rate is measured over
+    """
+    self._clock = clock
+    self._window = window
+    self._counts = [0] * window
+    # The second each counter is for
+    self._seconds = [None] * window
+    self._count = 0
+
+  def mark(self, count = 1):
+    second = int(self._clock())
+    idx = second % self._window
+    if self._seconds[idx] != second:
+      self._seconds[idx] = second
+      self._counts[idx] = 0
+    self._counts[idx] += count
+    self._count += count
+
+  def getRate(self):
+    """
+    :return: The occurrences per second over the last window seconds
+    """
+    second = int(self._clock())
+    return float(sum(count for count, countSecond in zip(self._counts, self._seconds)
+                     if countSecond is not None and second - countSecond < self._window)) / self._window
+
+  def getStats(self):
+    return {'count': self._count, 'perSecond': self.getRate()}
+
+class LoopLagMonitor(object):
+  """
+  Measures how much later than due a timer runs on the event loop, i.e.
+  how long callbacks hold up the loop
+  """
+  def __init__(self, loop, histogram, interval = 0.25):
+    """
+    :param histogram: The Histogram the lag in seconds is recorded in
+    :param interval: Seconds between measurements
+    """
+    self._loop = loop
+    self._histogram = histogram
+    self._interval = interval
+    self._due = None
+    self._timer = None
+
+  def start(self):
+    self._due = self._loop.time() + self._interval
+    self._timer = self._loop.call_at(self._due, self._onTimer)
+
+  def stop(self):
+    if self._timer is not None:
+      self._timer.cancel()
+      self._timer = None
+
+  def _onTimer(self):
+    self._histogram.record(max(0.0, self._loop.time() - self._due))
+    self.start()
+
+class CallbackProfiler(object):
+  """
+  Profiles the callbacks wrapped with wrap with cProfile, and nothing else,
+  so that waiting in the event loop stays out of the profile
+  """
+  def __init__(self):
+    self._profile = cProfile.Profile()
+    self._depth = 0
+
+  def wrap(self, callback):
+    """
+    :return: callback, profiled whenever it runs
+    """
+    @functools.wraps(callback)
+    def profiled(*args, **kwargs):
+      # Callbacks call each other, e.g. onUrlTranslated calls publishData
+      self._depth += 1
+      if self._depth == 1:
+        self._profile.enable()
+      try:
+        return callback(*args, **kwargs)
+      finally:
+        self._depth -= 1
+        if self._depth == 0:
+          self._profile.disable()
+    return profiled
+
+  def dumpStats(self, fileName):
+    """
+    Write the profile so far for pstats (or snakeviz); not from inside a wrapped callback
+    """
+    self._profile.dump_stats(fileName)
+
+class MetricsExporter(object):
+  """
+  Takes a snapshot of the metrics on the event loop every interval seconds,
+  writes it as JSON to a file and/or serves it at
+  http://127.0.0.1:<port>/metrics, and dumps the profile of a
+  CallbackProfiler. The HTTP server runs on its own thread and hands out
+  the last snapshot, so it still answers while the loop is held up; the
+  "time" of the snapshot tells how old it is.
+  """
+  def __init__(self, loop, getSnapshot, interval = 5.0, fileName = None, port = None,
+               profiler = None, profileFileName = None):
+    """
+    :param getSnapshot: Called on the loop as getSnapshot() for the dict to export
+    :param fileName: The file the snapshot is written to, replaced atomically; None for none
+    :param port: The local port to serve the snapshot on, 0 for any free one; None for no server
+    :param profiler: A CallbackProfiler whose profile is written to profileFileName
+    """
+    self._loop = loop
+    self._getSnapshot = getSnapshot
+    self._interval = interval
+    self._fileName = fileName
+    self._port = port
+    self._profiler = profiler
+    self._profileFileName = profileFileName
+    self._lastSnapshot = None
+    self._timer = None
+    self._server = None
+
+  def start(self):
+    if self._port is not None:
+      self._server = HTTPServer(("127.0.0.1", self._port), _makeHandler(self))
+      thread = threading.Thread(target = self._server.serve_forever, name = "metrics-http")
+      thread.daemon = True
+      thread.start()
+    self._export()
+
+  def stop(self):
+    if self._timer is not None:
+      self._timer.cancel()
+      self._timer = None
+    if self._server is not None:
+      self._server.shutdown()
+      self._server.server_close()
+      self._server = None
+
+  def getPort(self):
+    """
+    :return: The port the snapshot is served on, or None
+    """
+    return None if self._server is None else self._server.server_address[1]
+
+  def getLastSnapshot(self):
+    """
+    :return: The last snapshot as JSON, or None before the first one
+    """
+    return self._lastSnapshot
+
+  def _export(self):
+    self._timer = self._loop.call_later(self._interval, self._export)
+    snapshot = json.dumps(self._getSnapshot())
+    self._lastSnapshot = snapshot
+    if self._fileName is not None:
+      tempFileName = self._fileName + ".tmp"
+      with open(tempFileName, "w") as snapshotFile:
+        snapshotFile.write(snapshot)
+      os.rename(tempFileName, self._fileName)
+    if self._profiler is not None and self._profileFileName is not None:
+      self._profiler.dumpStats(self._profileFileName)
+
+def _makeHandler(exporter):
+  class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+      snapshot = exporter.getLastSnapshot()
+      if self.path.split('?')[0] not in ("/", "/metrics") or snapshot is None:
+        self.send_error(404)
+        return
+      body = snapshot.encode('utf-8')
+      self.send_response(200)
+      self.send_header("Content-Type", "application/json")
+      self.send_header("Content-Length", str(len(body)))
+      self.end_headers()
+      self.wfile.write(body)
+
+    def log_message(self, format, *args):
+      pass
+  return MetricsRequestHandler
+
+class PublisherMetrics(object):
+  """
+  The measurements a publisher records as it runs; see
+  NaiveEDLParserAndPublisher.getMetrics. All times are in seconds.
+  """
+  def __init__(self, clock = time.time):
+    """
+    :param clock: The function giving the current time, e.g. loop.time
+    """
+    # 10 ms to about 3 minutes
+    self.translationLatency = Histogram(exponentialBounds(0.01, 2, 15))
+    self.translationFailures = RateMeter(clock)
+    # How long after its scheduled publishing time an event was published; 1 ms to about a minute
+    self.publishLateness = Histogram(exponentialBounds(0.001, 2, 17))
+    # 10 us to about 0.3 s
+    self.signTime = Histogram(exponentialBounds(0.00001, 2, 15))
+    self.dataNotFound = RateMeter(clock)
+    # 1 ms to about 30 s
+    self.loopLag = Histogram(exponentialBounds(0.001, 2, 16))
@@ -0,0 +1,199 @@
+import json
+
+from timecode import FrameRate
+
+# A fixed-schema binary record for published events, much smaller than their
+# JSON and cheaper to decode. decodeContent turns either encoding back into
+# the dict the JSON content carries, so consumers can accept both.
+#
+# Record layout (version 1); varints are unsigned LEB128:
+#   version byte, flags byte, varint event id, then
+#   for end/removed records: string src_url, string translated
+#   otherwise: nominal fps byte, strings reel_name, channel, trans,
+#     varint frames src start, src end, dst start, dst end,
+#     strings src_url, translated, clipName, ytPresent,
+#     [varint line count, strings payload lines], [string ori_url]
+# A string is a varint n: 0 is None, 1 to len(_knownStrings) a string of
+# the table below, otherwise n - len(_knownStrings) - 1 bytes of UTF-8.
+FORMAT_VERSION = 1
+
+_FLAG_SENTINEL = 0x01
+# Source times are written unpadded, as after an EDL adjustment
+_FLAG_SRC_ADJUSTED = 0x02
+_FLAG_DROP_FRAME = 0x04
+_FLAG_PAYLOAD = 0x08
+_FLAG_ORI_URL = 0x10
+
+# Append only: the index of a string is part of the format
+_knownStrings = ["none", "n/a", "translated", "failed", "non-existent", "not-required",
+                 "publish", "YES", "NO", "end", "removed",
+                 "AX", "BL", "V", "A", "A2", "AA", "C", "D", "W", "B"]
+_knownStringIndex = dict((value, idx + 1) for idx, value in enumerate(_knownStrings))
+
+_rates = dict()
+
+def encodeEvent(event):
+  """
+  :param event: The EDLEvent to encode, as published by toDict
+  :return: The binary record of the event
+  :rtype: bytes
+  """
+  buf = bytearray()
+  buf.append(FORMAT_VERSION)
+  if event.isEnd:
+    buf.append(_FLAG_SENTINEL)
+    _writeVarint(buf, event.eventId)
+    _writeString(buf, event.srcUrl)
+    _writeString(buf, event.translated)
+    return bytes(buf)
+
+  flags = 0
+  if event.srcAdjusted:
+    flags |= _FLAG_SRC_ADJUSTED
+  if event.rate.dropFrame:
+    flags |= _FLAG_DROP_FRAME
+  if event.payload is not None:
+    flags |= _FLAG_PAYLOAD
+  if event.oriUrl is not None:
+    flags |= _FLAG_ORI_URL
+  buf.append(flags)
+  _writeVarint(buf, event.eventId)
+  buf.append(event.rate.nominal)
+  for value in (event.reelName, event.channel, event.trans):
+    _writeString(buf, value)
+  for frames in (event.srcStart, event.srcEnd, event.dstStart, event.dstEnd):
+    _writeVarint(buf, frames)
+  for value in (event.srcUrl, event.translated, event.clipName, event.ytPresent):
+    _writeString(buf, value)
+  if event.payload is not None:
+    _writeVarint(buf, len(event.payload))
+    for line in event.payload:
+      _writeString(buf, line)
+  if event.oriUrl is not None:
+    _writeString(buf, event.oriUrl)
+  return bytes(buf)
+
+def decodeEvent(content):
+  """
+  :param content: A binary record made by encodeEvent, as bytes, bytearray or Blob.toBytes()
+  :return: The event as the dict its JSON content carries
+  :rtype: dict
+  :raises ValueError: If the record is malformed or of an unknown version
+  """
+  buf = bytearray(content)
+  try:
+    if buf[0] != FORMAT_VERSION:
+      raise ValueError("Unknown event record version " + str(buf[0]))
+    flags = buf[1]
+    eventId, offset = _readVarint(buf, 2)
+    if flags & _FLAG_SENTINEL:
+      srcUrl, offset = _readString(buf, offset)
+      translated, offset = _readString(buf, offset)
+      return {
+        "event_id": str(eventId),
+        "src_url": srcUrl,
+        "translated": translated
+      }
+
+    rate = _getRate(buf[offset], bool(flags & _FLAG_DROP_FRAME))
+    offset += 1
+    strings = []
+    for _ in range(3):
+      value, offset = _readString(buf, offset)
+      strings.append(value)
+    frames = []
+    for _ in range(4):
+      value, offset = _readVarint(buf, offset)
+      frames.append(value)
+    for _ in range(4):
+      value, offset = _readString(buf, offset)
+      strings.append(value)
+    padded = not (flags & _FLAG_SRC_ADJUSTED)
+    result = {
+      "event_id": str(eventId),
+      "reel_name": strings[0],
+      "channel": strings[1],
+      "trans": strings[2],
+      "src_start_time": rate.toTimecode(frames[0], padded),
+      "src_end_time": rate.toTimecode(frames[1], padded),
+      "dst_start_time": rate.toTimecode(frames[2]),
+      "dst_end_time": rate.toTimecode(frames[3]),
+      "src_url": strings[3],
+      "translated": strings[4],
+      "clipName": strings[5],
+      "ytPresent": strings[6]
+    }
+    if flags & _FLAG_PAYLOAD:
+      count, offset = _readVarint(buf, offset)
+      payload = []
+      for _ in range(count):
+        line, offset = _readString(buf, offset)
+        payload.append(line)
+      result["payload"] = payload
+    if flags & _FLAG_ORI_URL:
+      result["ori_url"], offset = _readString(buf, offset)
+  except IndexError:
+    raise ValueError("Truncated event record")
+  return result
+
+def decodeContent(content):
+  """
+  Decode the content of a published event in either encoding
+  :param content: The Data content, as bytes, bytearray, str or Blob.toBytes()
+  :return: The event as a dict
+  :rtype: dict
+  """
+  if not isinstance(content, (bytes, bytearray)):
+    content = bytes(content) if isinstance(content, memoryview) else content.encode('utf-8')
+  if bytearray(content[:1]) == bytearray(b'{'):
+    return json.loads(bytes(content).decode('utf-8'))
+  return decodeEvent(content)
+
+def _getRate(nominal, dropFrame):
+  key = (nominal, dropFrame)
+  if key not in _rates:
+    # Timecodes only depend on the nominal rate and drop frame counting
+    _rates[key] = FrameRate(nominal * 1000 / 1001.0 if dropFrame else nominal, dropFrame)
+  return _rates[key]
+
+def _writeVarint(buf, value):
+  if value < 0:
+    raise ValueError("Cannot encode negative value " + str(value))
+  while value >= 0x80:
+    buf.append((value & 0x7f) | 0x80)
+    value >>= 7
+  buf.append(value)
+
+def _readVarint(buf, offset):
+  value = 0
+  shift = 0
+  while True:
+    byte = buf[offset]
+    offset += 1
+    value |= (byte & 0x7f) << shift
+    if byte < 0x80:
+      return value, offset
+    shift += 7
+
+def _writeString(buf, value):
+  if value is None:
+    buf.append(0)
+    return
+  known = _knownStringIndex.get(value)
+  if known is not None:
+    _writeVarint(buf, known)
+    return
+  encoded = value if isinstance(value, bytes) else value.encode('utf-8')
+  _writeVarint(buf, len(encoded) + len(_knownStrings) + 1)
+  buf.extend(encoded)
+
+def _readString(buf, offset):
+  n, offset = _readVarint(buf, offset)
+  if n == 0:
+    return None, offset
+  if n <= len(_knownStrings):
+    return _knownStrings[n - 1], offset
+  end = offset + n - len(_knownStrings) - 1
+  if end > len(buf):
+    raise IndexError()
+  return bytes(buf[offset:end]).decode('utf-8'), end
@@ -0,0 +1,53 @@
+import heapq
+
+import pytest
+
+class _Handle(object):
+  def __init__(self, when, callback, args):
+    self.when = when
+    self.callback = callback
+    self.args = args
+    self.cancelled = False
+
+  def cancel(self):
+    self.cancelled = True
+
+class ManualLoop(object):
+  """
+  The timer part of an event loop, on a clock that only moves with advance
+  """
+  def __init__(self):
+    self._time = 0.0
+    self._timers = []
+    self._sequence = 0
+
+  def time(self):
+    return self._time
+
+  def call_at(self, when, callback, *args):
+    handle = _Handle(when, callback, args)
+    heapq.heappush(self._timers, (when, self._sequence, handle))
+    self._sequence += 1
+    return handle
+
+  def call_later(self, delay, callback, *args):
+    return self.call_at(self._time + delay, callback, *args)
+
+  def getTimerCount(self):
+    return sum(1 for _, _, handle in self._timers if not handle.cancelled)
+
+  def advance(self, seconds):
+    """
+    Move the clock seconds ahead, running the timers due on the way
+    """
+    end = self._time + seconds
+    while self._timers and self._timers[0][0] <= end:
+      when, _, handle = heapq.heappop(self._timers)
+      self._time = max(self._time, when)
+      if not handle.cancelled:
+        handle.callback(*handle.args)
+    self._time = end
+
+@pytest.fixture
+def loop():
+  return ManualLoop()
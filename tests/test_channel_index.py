@@ -0,0 +1,176 @@
+import json
+import threading
+
+try:
+  from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+  from urlparse import urlparse, parse_qs
+except ImportError:
+  from http.server import BaseHTTPRequestHandler, HTTPServer
+  from urllib.parse import urlparse, parse_qs
+
+from channel_index import ChannelIndex, makePublicPageFetcher
+
+class Channel(object):
+  """
+  A fake channel serving its uploads, newest first, in pages of pageSize
+  """
+  def __init__(self, pageSize = 2):
+    self.uploads = []
+    self.pageSize = pageSize
+    self.requests = []
+
+  def upload(self, title, videoId):
+    self.uploads.insert(0, (title, videoId))
+
+  def getEtag(self):
+    return "etag-" + str(len(self.uploads))
+
+  def fetchPage(self, pageToken, etag):
+    self.requests.append((pageToken, etag))
+    if etag is not None and etag == self.getEtag():
+      return None
+    start = int(pageToken or 0)
+    end = start + self.pageSize
+    nextPageToken = str(end) if end < len(self.uploads) else None
+    return (self.uploads[start:end], nextPageToken, self.getEtag())
+
+def test_incremental_refresh(tmp_path):
+  channel = Channel()
+  for idx in range(5):
+    channel.upload("Clip " + str(idx), "v" + str(idx))
+  path = str(tmp_path / "index.json")
+  index = ChannelIndex(path)
+  assert index.refresh(channel.fetchPage) == 5
+  assert len(channel.requests) == 3
+
+  channel.upload("Clip 5", "v5")
+  channel.requests = []
+  assert index.refresh(channel.fetchPage) == 1
+  # Stops at the first page with a known video
+  assert channel.requests == [(None, "etag-5")]
+  assert index.getTitles()["Clip 5"] == "v5"
+  assert len(ChannelIndex(path)) == 6
+
+def test_not_modified(tmp_path):
+  channel = Channel()
+  channel.upload("Clip", "v0")
+  index = ChannelIndex(str(tmp_path / "index.json"))
+  index.refresh(channel.fetchPage)
+  channel.requests = []
+  assert index.refresh(channel.fetchPage) == 0
+  assert channel.requests == [(None, "etag-1")]
+
+def test_oldest_upload_keeps_shared_title(tmp_path):
+  channel = Channel()
+  channel.upload("Clip", "old")
+  index = ChannelIndex(str(tmp_path / "index.json"))
+  index.refresh(channel.fetchPage)
+  channel.upload("Clip", "new")
+  channel.upload("Other", "other")
+  index.refresh(channel.fetchPage)
+  assert index.getVideoUrlDict() == {"clip": "old", "other": "other"}
+
+def test_full_refresh_drops_deleted(tmp_path):
+  channel = Channel()
+  channel.upload("Gone", "v0")
+  channel.upload("Kept", "v1")
+  path = str(tmp_path / "index.json")
+  index = ChannelIndex(path)
+  index.refresh(channel.fetchPage)
+  del channel.uploads[1]
+  channel.uploads.insert(0, ("New", "v2"))
+  channel.requests = []
+  assert index.refresh(channel.fetchPage, full = True) == 2
+  # A full refresh does not send the etag
+  assert channel.requests[0] == (None, None)
+  assert index.getTitles() == {"Kept": "v1", "New": "v2"}
+  with open(path) as indexFile:
+    assert json.load(indexFile)["videoIds"] == ["v1", "v2"]
+
+class SearchApi(object):
+  """
+  A local Youtube search API serving the uploads of channel, with its etag
+  in the ETag header and the body, and 304 when If-None-Match matches it
+  """
+  def __init__(self, channel):
+    self.channel = channel
+    # (query, If-None-Match) in the order received
+    self.requests = []
+    self._server = HTTPServer(("127.0.0.1", 0), self._makeHandler())
+    thread = threading.Thread(target = self._server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+  def getUrl(self):
+    return "http://127.0.0.1:" + str(self._server.server_address[1]) + "/youtube/v3/"
+
+  def close(self):
+    self._server.shutdown()
+    self._server.server_close()
+
+  def _makeHandler(self):
+    api = self
+    class Handler(BaseHTTPRequestHandler):
+      def do_GET(self):
+        url = urlparse(self.path)
+        query = dict((key, values[0]) for key, values in parse_qs(url.query).items())
+        etag = self.headers.get("If-None-Match")
+        api.requests.append((query, etag))
+        if url.path != "/youtube/v3/search":
+          self.send_error(404)
+          return
+        channel = api.channel
+        if etag == channel.getEtag():
+          self.send_response(304)
+          self.end_headers()
+          return
+        start = int(query.get("pageToken", 0))
+        end = start + int(query["maxResults"])
+        result = {
+          "etag": channel.getEtag(),
+          "items": [{"id": {"kind": "youtube#video", "videoId": videoId}, "snippet": {"title": title}}
+            for title, videoId in channel.uploads[start:end]]
+        }
+        if end < len(channel.uploads):
+          result["nextPageToken"] = str(end)
+        body = json.dumps(result).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", channel.getEtag())
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+      def log_message(self, format, *args):
+        pass
+    return Handler
+
+def test_public_page_fetcher_not_modified(tmp_path):
+  channel = Channel()
+  for idx in range(3):
+    channel.upload("Clip " + str(idx), "v" + str(idx))
+  api = SearchApi(channel)
+  try:
+    fetchPage = makePublicPageFetcher("UC-channel", "api-key", api.getUrl(), maxResults = 2)
+    index = ChannelIndex(str(tmp_path / "index.json"))
+    assert index.refresh(fetchPage) == 3
+    assert index.getTitles() == {"Clip 0": "v0", "Clip 1": "v1", "Clip 2": "v2"}
+    query, etag = api.requests[0]
+    assert (query["key"], query["channelId"], query["maxResults"], etag) == ("api-key", "UC-channel", "2", None)
+    assert api.requests[1][0]["pageToken"] == "2"
+
+    # Answered 304 with nothing to list
+    api.requests = []
+    assert index.refresh(fetchPage) == 0
+    assert [etag for query, etag in api.requests] == ["etag-3"]
+    assert len(ChannelIndex(str(tmp_path / "index.json"))) == 3
+
+    # Modified again: only the first page is listed
+    channel.upload("Clip 3", "v3")
+    api.requests = []
+    assert index.refresh(fetchPage) == 1
+    assert [etag for query, etag in api.requests] == ["etag-3"]
+    assert index.getTitles()["Clip 3"] == "v3"
+    assert fetchPage(None, "etag-4") is None
+  finally:
+    api.close()
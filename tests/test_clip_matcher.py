@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+import clip_matcher
+from clip_matcher import ClipNameIndex, catalogTitle, normalizeTitle
+
+CATALOG = {
+  "Kitchen Wall GFX": "v1",
+  "Drone river bridge at sunset": "v2",
+  "Interview studio wide": "v3",
+  "Market crowd night": "v4",
+}
+
+def test_catalog_title():
+  assert catalogTitle("Kitchen_Wall-GFX.mov") == "kitchen wall gfx"
+  assert catalogTitle("MONO-040.wav") is None
+  assert normalizeTitle("  Drone -- River_Bridge! ") == "drone river bridge"
+
+def test_exact_fuzzy_and_miss():
+  index = ClipNameIndex(CATALOG)
+  assert index.lookup("kitchen wall gfx") == ("v1", "Kitchen Wall GFX", 1.0)
+  videoId, title, score = index.lookup("drone river bridge at sunset v2")
+  assert (videoId, title) == ("v2", "Drone river bridge at sunset")
+  assert 0.8 <= score < 1.0
+  assert index.lookup("street pan slow") is None
+  assert ClipNameIndex({}).lookup("anything") is None
+
+def test_counting_matches_candidate_scoring(monkeypatch):
+  rand = random.Random(0)
+  words = ["kitchen", "wall", "gfx", "pov", "rails", "email", "screen", "drone", "river", "bridge"]
+  catalog = dict((" ".join(rand.sample(words, 4)) + " " + str(idx), "v" + str(idx)) for idx in range(500))
+  queries = [title[:-1] + "x" for title in list(catalog)[:50]] + [" ".join(rand.sample(words, 3)) for _ in range(50)]
+  withCounting = ClipNameIndex(catalog)
+  monkeypatch.setattr(clip_matcher, "numpy", None)
+  withCandidates = ClipNameIndex(catalog)
+  matched = 0
+  for query in queries:
+    expected = withCandidates.lookup(query)
+    result = withCounting.lookup(query)
+    if expected is None:
+      assert result is None
+    else:
+      assert result[2] == pytest.approx(expected[2])
+      matched += 1
+  assert matched >= 40
+
+def test_parse_resolves_clip_names_at_once(tmp_path, monkeypatch):
+  # The publisher needs PyNDN and the Google API client
+  pytest.importorskip("pyndn")
+  pytest.importorskip("apiclient")
+  from dry_run import DryRun
+
+  edlFile = tmp_path / "cut.edl"
+  edlFile.write_text("TITLE: fuzzy\n\n"
+    "001  AX       V     C        00:00:00:00 00:00:03:00 00:00:00:00 00:00:03:00\n"
+    "* FROM CLIP NAME: Kitchen_Wall-GFX.mov\n\n"
+    "002  AX       V     C        00:00:00:00 00:00:03:00 00:00:03:00 00:00:06:00\n"
+    "* FROM CLIP NAME: Drone_River_Bridge_at_Sunset_v2.mov\n\n"
+    "003  AX       V     C        00:00:00:00 00:00:03:00 00:00:06:00 00:00:09:00\n"
+    "* FROM CLIP NAME: Drone_River_Bridge_at_Sunset_v2.mov\n\n"
+    "004  AX       V     C        00:00:00:00 00:00:03:00 00:00:09:00 00:00:12:00\n"
+    "* FROM CLIP NAME: Street_Pan_Slow.mov\n\n")
+  publisher = DryRun(applyEDLAdjustment = False).getPublisher()
+  publisher._videoUrlDict.update((title.lower(), videoId) for title, videoId in CATALOG.items())
+  calls = []
+  resolveAll = ClipNameIndex.resolveAll
+  lookup = ClipNameIndex.lookup
+  monkeypatch.setattr(ClipNameIndex, "resolveAll",
+    lambda index, clipNames: calls.append(sorted(clipNames)) or resolveAll(index, clipNames))
+  monkeypatch.setattr(ClipNameIndex, "lookup",
+    lambda index, clipName: calls.append(clipName) or lookup(index, clipName))
+  publisher.parse(str(edlFile))
+
+  # Exact titles are not fuzzy matched, and each other one only once, in one batch
+  assert calls[0] == ["drone river bridge at sunset v2"] * 2 + ["street pan slow"]
+  assert sorted(calls[1:]) == ["drone river bridge at sunset v2", "street pan slow"]
+  events = publisher._events
+  assert (events[1].srcUrl, events[1].ytPresent) == ("https://www.youtube.com/watch?v=v1", "YES")
+  assert (events[2].srcUrl, events[3].srcUrl) == ("https://www.youtube.com/watch?v=v2",) * 2
+  assert events[4].ytPresent == "NO"
@@ -0,0 +1,26 @@
+import time
+
+from content_store import BoundedContentCache
+
+class Interest(object):
+  def __init__(self, lifetimeMilliseconds):
+    self._lifetime = lifetimeMilliseconds
+
+  def getInterestLifetimeMilliseconds(self):
+    return self._lifetime
+
+def test_pending_interests_are_cleaned_up_periodically(loop):
+  cache = BoundedContentCache(None, loop = loop, cleanupIntervalSeconds = 1)
+  assert loop.getTimerCount() == 0
+  cache.storePendingInterest(Interest(1), None)
+  cache.storePendingInterest(Interest(60000), None)
+  assert loop.getTimerCount() == 1
+  time.sleep(0.01)
+  loop.advance(1)
+  assert cache.getStats()['pendingInterests'] == 1
+  # Rearmed while an Interest is pending
+  assert loop.getTimerCount() == 1
+  cache._pendingInterests = [(interest, face, 0) for interest, face, _ in cache._pendingInterests]
+  loop.advance(1)
+  assert cache.getStats()['pendingInterests'] == 0
+  assert loop.getTimerCount() == 0
@@ -0,0 +1,22 @@
+import pytest
+
+# The publisher needs PyNDN and the Google API client
+pytest.importorskip("pyndn")
+pytest.importorskip("apiclient")
+
+from dry_run import DryRun
+from edl_parser import EDLEvent
+from timecode import FrameRate
+
+def test_adjustment_uses_event_frame_rate(tmp_path):
+  csvFile = tmp_path / "batch-list.csv"
+  csvFile.write_text("Unknown Tape,01:00:00:00,00:10:00:00,clip.mov,,,,,\n")
+  publisher = DryRun(applyEDLAdjustment = True).getPublisher()
+  publisher.loadEDLAdjustment(str(csvFile))
+
+  rate = FrameRate(29.97, True)
+  event = EDLEvent(1, srcStart = rate.toFrames("01:01:00;02"), srcEnd = rate.toFrames("01:01:10;00"), rate = rate)
+  assert publisher.resolveClipName(event, "clip.mov")
+  assert event.srcStart == rate.toFrames("00:01:00;02")
+  assert event.srcEnd == rate.toFrames("00:01:10;00")
+  assert event.srcAdjusted
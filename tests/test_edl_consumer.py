@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+pytest.importorskip("pyndn")
+
+from pyndn import Data, Name
+
+from edl_consumer import EDLConsumer
+from edl_parser import EDLEvent
+from payload_codec import encodeEvent
+
+PREFIX = "/test/edl/"
+
+class FakeFace(object):
+  """
+  Keeps the expressed Interests until the test answers or times them out
+  """
+  def __init__(self):
+    self.pending = dict()
+    self.expressed = []
+    self._nextId = 0
+
+  def expressInterest(self, interest, onData, onTimeout):
+    self._nextId += 1
+    seq = int(interest.getName().toUri().split("/")[-1])
+    self.pending[self._nextId] = (seq, interest, onData, onTimeout)
+    self.expressed.append(seq)
+    return self._nextId
+
+  def removePendingInterest(self, pendingInterestId):
+    self.pending.pop(pendingInterestId, None)
+
+  def getPendingSeqs(self):
+    return sorted(seq for seq, _, _, _ in self.pending.values())
+
+  def _take(self, seq):
+    for pendingInterestId, entry in list(self.pending.items()):
+      if entry[0] == seq:
+        del self.pending[pendingInterestId]
+        return entry
+    raise AssertionError("no Interest pending for " + str(seq))
+
+  def answer(self, seq, content):
+    _, interest, onData, _ = self._take(seq)
+    data = Data(Name(PREFIX + str(seq)))
+    data.setContent(content)
+    onData(interest, data)
+
+  def timeOut(self, seq):
+    _, interest, _, onTimeout = self._take(seq)
+    onTimeout(interest)
+
+def content(seq):
+  return json.dumps({"event_id": str(seq + 1), "src_url": "none"})
+
+def endContent(seq):
+  return encodeEvent(EDLEvent.makeEnd(seq + 1))
+
+def makeConsumer(loop, **kwargs):
+  face = FakeFace()
+  delivered = []
+  consumer = EDLConsumer(face, PREFIX, onEvent = lambda seq, event: delivered.append(seq),
+                         loop = loop, **kwargs)
+  return face, consumer, delivered
+
+def test_in_order_delivery_until_end(loop):
+  face, consumer, delivered = makeConsumer(loop)
+  ended = []
+  consumer._onEnd = lambda: ended.append(True)
+  consumer.start()
+  assert face.getPendingSeqs() == [0, 1, 2, 3]
+  face.answer(1, content(1))
+  face.answer(2, endContent(2))
+  # Held back until 0 arrives; nothing expressed past the end
+  assert delivered == []
+  assert face.getPendingSeqs() == [0]
+  face.answer(0, content(0))
+  assert delivered == [0, 1, 2]
+  assert ended == [True] and consumer.isFinished()
+  assert face.pending == dict()
+
+def test_window_grows_with_data(loop):
+  face, consumer, _ = makeConsumer(loop, initialWindow = 2, maxWindow = 8)
+  consumer.start()
+  loop.advance(0.1)
+  face.answer(0, content(0))
+  # About one more Interest per round trip
+  assert consumer.getStats()["window"] == 2.5
+  assert consumer.getStats()["srtt"] == pytest.approx(0.1)
+  for seq in range(1, 40):
+    loop.advance(0.1)
+    face.answer(seq, content(seq))
+  stats = consumer.getStats()
+  assert stats["window"] == 8
+  assert stats["nextSeq"] == 40
+  # Bounded by maxWindow ahead of the next event to hand over
+  assert face.getPendingSeqs() == list(range(40, 48))
+
+def test_window_halved_once_per_round_trip(loop):
+  face, consumer, delivered = makeConsumer(loop, initialWindow = 8)
+  consumer.start()
+  loop.advance(4)
+  face.timeOut(0)
+  assert consumer.getStats()["window"] == 4
+  # Interests expressed before the decrease do not halve it again
+  loop.advance(1)
+  for seq in range(1, 4):
+    face.timeOut(seq)
+  assert consumer.getStats()["window"] == 4
+  assert consumer.getStats()["retransmissions"] == 4
+  loop.advance(1)
+  face.timeOut(1)
+  assert consumer.getStats()["window"] == 2
+  face.answer(0, content(0))
+  assert delivered == [0]
+
+def test_gives_up_after_max_retries(loop):
+  face, consumer, delivered = makeConsumer(loop, initialWindow = 2, maxRetries = 1)
+  failed = []
+  consumer._onFailed = failed.append
+  consumer.start()
+  face.timeOut(0)
+  loop.advance(1)
+  face.timeOut(0)
+  assert failed == [0]
+  face.answer(1, content(1))
+  assert delivered == [1]
@@ -0,0 +1,89 @@
+import multiprocessing
+
+import edl_parser
+from edl_parser import DEFAULT_FRAME_RATE, IncrementalEDLParser, diffEvents, iterEvents, iterEventsParallel
+
+EDL = """TITLE: incremental
+FCM: NON-DROP FRAME
+
+001  AX       V     C        00:00:00:00 00:00:03:00 00:00:00:00 00:00:03:00
+* FROM CLIP NAME: Opening.mov
+
+002  AX       V     C        00:00:06:03 00:00:10:07 00:00:03:00 00:00:07:04
+* FROM CLIP NAME: Opening.mov
+M2   AX       026.9                      00:00:06:03
+
+FCM: DROP FRAME
+003  AX       V     C        00:00:59;20 00:01:07;12 00:00:07;04 00:00:14;26
+* FROM CLIP NAME: MVI_7167.MOV
+"""
+
+def lines(text):
+  return text.splitlines(True)
+
+def signatures(events):
+  return dict((event.eventId, event.signature()) for event in events)
+
+def test_iter_events():
+  events = list(iterEvents(lines(EDL)))
+  assert [event.eventId for event in events] == [1, 2, 3]
+  assert events[1].fromClipNames == ["Opening.mov"]
+  assert events[1].payload == ["M2   AX       026.9                      00:00:06:03\n"]
+  assert events[2].rate == DEFAULT_FRAME_RATE.withFCM(True)
+  assert events[2].srcStart == DEFAULT_FRAME_RATE.withFCM(True).toFrames("00:00:59;20")
+
+def test_incremental_parse_matches_full_parse():
+  parser = IncrementalEDLParser()
+  events, parsedBlocks = parser.parse(lines(EDL))
+  assert signatures(events.values()) == signatures(iterEvents(lines(EDL)))
+  assert parsedBlocks == 4
+
+  changed = EDL.replace("00:00:06:03 00:00:10:07", "00:00:06:03 00:00:10:08")
+  changedEvents, parsedBlocks = parser.parse(lines(changed))
+  assert parsedBlocks == 1
+  assert signatures(changedEvents.values()) == signatures(iterEvents(lines(changed)))
+  assert diffEvents(events, changedEvents) == ([], [2], [])
+
+def test_diff_added_and_removed():
+  parser = IncrementalEDLParser()
+  events, _ = parser.parse(lines(EDL))
+  appended = EDL + "\n004  AX       V     C        00:00:00:00 00:00:01:00 00:00:14:26 00:00:15:26\n"
+  appendedEvents, parsedBlocks = parser.parse(lines(appended))
+  assert parsedBlocks == 1
+  assert diffEvents(events, appendedEvents) == ([4], [], [])
+  assert diffEvents(appendedEvents, events) == ([], [], [4])
+
+def test_blocks_split_at_whitespace_only_lines():
+  # After a blank line, a line starting with whitespace is still an event line
+  text = EDL.replace("\n002  AX", "\n  002  AX")
+  events, _ = IncrementalEDLParser().parse(lines(text))
+  assert sorted(events) == [1, 2, 3]
+  assert signatures(events.values()) == signatures(iterEvents(lines(text)))
+
+def writeLargeEDL(path, count):
+  blocks = [EDL]
+  for idx in range(4, count):
+    blocks.append("%03d  AX       V     C        00:00:00;00 00:00:01;00 00:00:00;00 00:00:01;00\n"
+      "* FROM CLIP NAME: Clip %d.mov\n\n" % (idx, idx))
+  path.write_text("\n".join(blocks))
+  return str(path)
+
+def test_parallel_matches_serial(tmp_path):
+  fileName = writeLargeEDL(tmp_path / "large.edl", 3000)
+  serial = signatures(iterEvents(fileName))
+  assert signatures(iterEventsParallel(fileName, processes = 2, chunkSize = 16 * 1024)) == serial
+
+def test_small_files_are_parsed_serially(tmp_path, monkeypatch):
+  fileName = writeLargeEDL(tmp_path / "small.edl", 300)
+  def noPool(*args):
+    raise AssertionError("no pool expected")
+  monkeypatch.setattr(multiprocessing, "Pool", noPool)
+  assert signatures(iterEventsParallel(fileName, processes = 4)) == signatures(iterEvents(fileName))
+  monkeypatch.setattr(edl_parser, "MIN_PARALLEL_SIZE", 0)
+  monkeypatch.setattr(edl_parser, "MIN_CHUNK_SIZE", 1024)
+  try:
+    list(iterEventsParallel(fileName, processes = 4))
+  except AssertionError:
+    pass
+  else:
+    assert False, "a pool was expected above MIN_PARALLEL_SIZE"
@@ -0,0 +1,45 @@
+import os
+
+from edl_watcher import EDLFileWatcher
+
+def write(path, text, mtime):
+  path.write_text(text)
+  # Set explicitly: consecutive writes may fall within the file system's time resolution
+  os.utime(str(path), (mtime, mtime))
+
+def test_change_reported_once_settled(tmp_path, loop):
+  path = tmp_path / "cut.edl"
+  write(path, "001\n", 100)
+  changes = []
+  watcher = EDLFileWatcher(loop, str(path), changes.append, interval = 1.0)
+  watcher.start()
+  loop.advance(3)
+  assert changes == []
+
+  write(path, "001\n002\n", 200)
+  loop.advance(1)
+  assert changes == []
+  # Still being written
+  write(path, "001\n002\n003\n", 201)
+  loop.advance(1)
+  assert changes == []
+  loop.advance(1)
+  assert changes == [["001\n", "002\n", "003\n"]]
+  loop.advance(3)
+  assert len(changes) == 1
+
+def test_missing_file_and_stop(tmp_path, loop):
+  path = tmp_path / "cut.edl"
+  changes = []
+  watcher = EDLFileWatcher(loop, str(path), changes.append)
+  watcher.start()
+  loop.advance(2)
+  write(path, "001\n", 100)
+  loop.advance(2)
+  assert changes == [["001\n"]]
+
+  watcher.stop()
+  assert loop.getTimerCount() == 0
+  write(path, "002\n", 200)
+  loop.advance(5)
+  assert len(changes) == 1
@@ -0,0 +1,84 @@
+from event_scheduler import EventScheduler
+
+def makeScheduler(loop, ran, deadlines, anchors = None):
+  scheduler = EventScheduler(loop)
+  handles = []
+  for idx, deadline in enumerate(deadlines):
+    anchor = None if anchors is None else anchors[idx]
+    handles.append(scheduler.schedule(deadline, ran.append, (idx,), anchor))
+  return scheduler, handles
+
+def test_runs_in_deadline_order_with_one_timer(loop):
+  ran = []
+  scheduler, _ = makeScheduler(loop, ran, [3, 1, 2, 1])
+  scheduler.start()
+  assert loop.getTimerCount() == 1
+  loop.advance(1.5)
+  assert ran == [1, 3]
+  loop.advance(2)
+  assert ran == [1, 3, 2, 0]
+  assert scheduler.getPendingCount() == 0
+  assert scheduler.getLatenessStats()['count'] == 4
+
+def test_start_offset_skips_earlier_entries(loop):
+  ran = []
+  scheduler, _ = makeScheduler(loop, ran, [1, 2, 3])
+  scheduler.start(2)
+  loop.advance(0)
+  assert ran == [1]
+  loop.advance(1)
+  assert ran == [1, 2]
+
+def test_pause_and_resume(loop):
+  ran = []
+  scheduler, _ = makeScheduler(loop, ran, [1, 2])
+  scheduler.start()
+  loop.advance(1.5)
+  scheduler.pause()
+  loop.advance(10)
+  assert ran == [0]
+  assert scheduler.getPosition() == 1.5
+  scheduler.resume()
+  loop.advance(0.4)
+  assert ran == [0]
+  loop.advance(0.2)
+  assert ran == [0, 1]
+
+def test_seek_keeps_anchored_entries_and_brings_back_dropped_ones(loop):
+  ran = []
+  # Entry 1 is due before the position it is anchored at, like a translation ahead of its event
+  scheduler, _ = makeScheduler(loop, ran, [1, 4, 5, 8], [1, 6, 5, 8])
+  scheduler.start()
+  scheduler.seek(6)
+  loop.advance(0)
+  assert ran == [1]
+  assert scheduler.getLateness(4) is None
+  scheduler.seek(0)
+  loop.advance(5)
+  assert ran == [1, 0, 2]
+  loop.advance(3)
+  assert ran == [1, 0, 2, 3]
+
+def test_entries_are_forgotten_once_run_or_cancelled(loop):
+  ran = []
+  scheduler, handles = makeScheduler(loop, ran, [1, 2, 3])
+  scheduler.start()
+  scheduler.cancel(handles[1])
+  loop.advance(1)
+  assert len(scheduler._entries) == 1
+  loop.advance(5)
+  assert ran == [0, 2]
+  assert len(scheduler._entries) == 0
+  # Seeking back runs nothing again
+  scheduler.seek(0)
+  loop.advance(5)
+  assert ran == [0, 2]
+
+def test_cancelled_entries_do_not_pile_up(loop):
+  scheduler = EventScheduler(loop)
+  scheduler.start()
+  for deadline in range(1000):
+    scheduler.cancel(scheduler.schedule(1000 + deadline, lambda: None))
+  assert len(scheduler._entries) == 0
+  assert len(scheduler._pending) <= 64
+  assert scheduler.getPendingCount() == 0
@@ -0,0 +1,50 @@
+import pytest
+
+from lead_time import LeadTimeEstimator
+
+def test_percentile():
+  estimator = LeadTimeEstimator()
+  assert estimator.getPercentile(95) is None
+  for latency in range(1, 21):
+    estimator.record(latency)
+  # Nearest rank
+  assert estimator.getPercentile(50) == 10
+  assert estimator.getPercentile(95) == 19
+  assert estimator.getPercentile(100) == 20
+  assert estimator.getPercentile(0) == 1
+
+def test_recent_samples_only():
+  estimator = LeadTimeEstimator(samples = 10)
+  for latency in [100] * 10 + [1] * 10:
+    estimator.record(latency)
+  assert estimator.getPercentile(100) == 1
+  assert estimator.getStats()['samples'] == 10
+
+def test_lead_time():
+  estimator = LeadTimeEstimator(defaultLeadTime = 57, minSamples = 10, safetyFactor = 2.0)
+  for latency in range(1, 10):
+    estimator.record(latency)
+  assert estimator.getLeadTime() == 57
+  estimator.record(10)
+  # The 95th percentile times the safety factor
+  assert estimator.getLeadTime() == 20
+
+def test_lead_time_bounds():
+  estimator = LeadTimeEstimator(minLeadTime = 2, maxLeadTime = 120, minSamples = 1)
+  estimator.record(0.1)
+  assert estimator.getLeadTime() == 2
+  for _ in range(100):
+    estimator.record(300)
+  assert estimator.getLeadTime() == 120
+  assert estimator.getMaxLeadTime() == 120
+  assert LeadTimeEstimator(defaultLeadTime = 200, maxLeadTime = 120).getMaxLeadTime() == 200
+
+def test_misses():
+  estimator = LeadTimeEstimator()
+  assert estimator.getMissFraction() == 0.0
+  for missed in (False, True, False, False):
+    estimator.recordDeadline(missed)
+  stats = estimator.getStats()
+  assert (stats['onTime'], stats['missed']) == (3, 1)
+  assert stats['missFraction'] == pytest.approx(0.25)
+  assert stats['leadTime'] == 57
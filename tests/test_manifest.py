@@ -0,0 +1,56 @@
+import json
+
+from manifest import ManifestBuilder
+
+def record(seq, srcUrl = "none"):
+  return {"event_id": str(seq + 1), "src_url": srcUrl}
+
+def publish(manifest):
+  return dict((segment, json.loads(manifest.encodeSegment(segment))) for segment in manifest.takeDirtySegments())
+
+def test_segments_and_final_segment():
+  manifest = ManifestBuilder(4)
+  for seq in range(6):
+    manifest.update(seq, record(seq))
+  segments = publish(manifest)
+  assert sorted(segments) == [0, 1]
+  assert [event["seq"] for event in segments[0]["events"]] == [0, 1, 2, 3]
+  assert (segments[1]["first_seq"], segments[1]["last_seq"]) == (4, 7)
+  assert "final_segment" not in segments[1]
+
+  manifest.update(6, {"event_id": "7", "src_url": "end"})
+  manifest.setFinalSeq(6)
+  # Only the last segment is published again for the final segment number
+  segments = publish(manifest)
+  assert sorted(segments) == [1]
+  assert segments[1]["final_segment"] == 1
+  assert manifest.getFinalSegment() == 1
+  assert len(manifest) == 2
+
+def test_sealed_segment_drops_records():
+  manifest = ManifestBuilder(4)
+  for seq in range(5):
+    manifest.update(seq, record(seq))
+  encoded = manifest.encodeSegment(0)
+  publish(manifest)
+  assert 0 not in manifest._segments and 0 in manifest._sealed
+  assert manifest.encodeSegment(0) == encoded
+
+  # Republishing an unchanged record leaves the segment alone
+  manifest.update(2, record(2))
+  assert manifest.takeDirtySegments() == []
+
+  manifest.update(2, record(2, "http://video/2"))
+  segments = publish(manifest)
+  assert sorted(segments) == [0]
+  assert [event["src_url"] for event in segments[0]["events"]] == ["none", "none", "http://video/2", "none"]
+  assert 0 in manifest._sealed
+
+def test_open_segment_is_not_sealed():
+  manifest = ManifestBuilder(4)
+  for seq in range(3):
+    manifest.update(seq, record(seq))
+  publish(manifest)
+  manifest.update(3, record(3))
+  segments = publish(manifest)
+  assert len(segments[0]["events"]) == 4
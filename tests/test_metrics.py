@@ -0,0 +1,66 @@
+import json
+
+try:
+  import urllib2 as urllib
+except ImportError:
+  import urllib.request as urllib
+
+from metrics import Histogram, LoopLagMonitor, MetricsExporter, RateMeter, exponentialBounds
+
+def test_histogram():
+  histogram = Histogram([1, 2, 4, 8])
+  assert histogram.getPercentile(50) is None
+  for value in (0.5, 1.5, 1.8, 3, 20):
+    histogram.record(value)
+  assert histogram.getPercentile(50) == 2
+  assert histogram.getPercentile(100) == 20
+  stats = histogram.getStats()
+  assert (stats["count"], stats["min"], stats["max"]) == (5, 0.5, 20)
+  assert stats["mean"] == 26.8 / 5
+  assert list(stats["buckets"].values()) == [1, 2, 1, 0, 1]
+  assert list(stats["buckets"])[-1] == "+Inf"
+
+def test_histogram_percentile_capped_by_max():
+  histogram = Histogram(exponentialBounds(0.001, 2, 10))
+  histogram.record(0.003)
+  assert histogram.getPercentile(99) == 0.003
+
+def test_rate_meter():
+  now = [100.0]
+  meter = RateMeter(lambda: now[0], window = 10)
+  meter.mark()
+  meter.mark(4)
+  now[0] += 5
+  meter.mark(5)
+  assert meter.getRate() == 1.0
+  # The first counts leave the window
+  now[0] += 6
+  assert meter.getStats() == {'count': 10, 'perSecond': 0.5}
+  now[0] += 10
+  meter.mark()
+  assert meter.getRate() == 0.1
+
+def test_loop_lag(loop):
+  histogram = Histogram([0.01, 0.1, 1])
+  monitor = LoopLagMonitor(loop, histogram, interval = 0.25)
+  monitor.start()
+  loop.advance(1)
+  assert histogram.getStats()["count"] == 4
+  assert histogram.getStats()["max"] == 0
+  monitor.stop()
+  assert loop.getTimerCount() == 0
+
+def test_exporter_file_and_http(tmp_path, loop):
+  snapshots = iter(range(100))
+  fileName = str(tmp_path / "metrics.json")
+  exporter = MetricsExporter(loop, lambda: {"n": next(snapshots)}, interval = 5, fileName = fileName, port = 0)
+  exporter.start()
+  try:
+    loop.advance(5)
+    with open(fileName) as metricsFile:
+      assert json.load(metricsFile) == {"n": 1}
+    response = urllib.urlopen("http://127.0.0.1:" + str(exporter.getPort()) + "/metrics")
+    assert json.loads(response.read().decode('utf-8')) == {"n": 1}
+  finally:
+    exporter.stop()
+  assert loop.getTimerCount() == 0
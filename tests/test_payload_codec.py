@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from edl_parser import EDLEvent, iterEvents
+from payload_codec import decodeContent, decodeEvent, encodeEvent
+
+EDL = """TITLE: codec
+
+001  AX       V     C        00:00:00:00 00:00:03:00 00:00:00:00 00:00:03:00
+* FROM CLIP NAME: Opening.mov
+M2   AX       026.9                      00:00:06:03
+
+FCM: DROP FRAME
+002  BL       V     C        00:00:59;20 00:01:07;12 00:00:03;00 00:00:10;22
+"""
+
+def events():
+  return list(iterEvents(EDL.splitlines(True)))
+
+def test_round_trip():
+  for event in events():
+    assert decodeEvent(encodeEvent(event)) == event.toDict()
+
+def test_round_trip_resolved_event():
+  event = events()[0]
+  event.srcUrl = u"https://www.youtube.com/watch?v=abc"
+  event.translated = "translated"
+  event.clipName = u"Opening \u00e9.mov"
+  event.ytPresent = "YES"
+  event.oriUrl = "https://www.youtube.com/watch?v=abc"
+  event.srcStart = 30 * 3600 * 5
+  event.srcAdjusted = True
+  assert decodeEvent(encodeEvent(event)) == event.toDict()
+
+def test_round_trip_end_and_removed():
+  for event in (EDLEvent.makeEnd(3), EDLEvent.makeRemoved(200)):
+    assert decodeEvent(encodeEvent(event)) == event.toDict()
+
+def test_decode_content_accepts_both_encodings():
+  event = events()[1]
+  assert decodeContent(json.dumps(event.toDict())) == event.toDict()
+  assert decodeContent(json.dumps(event.toDict()).encode('utf-8')) == event.toDict()
+  assert decodeContent(bytearray(encodeEvent(event))) == event.toDict()
+  assert len(encodeEvent(event)) < len(json.dumps(event.toDict()))
+
+def test_malformed_records():
+  record = encodeEvent(events()[0])
+  with pytest.raises(ValueError):
+    decodeEvent(record[:-3])
+  with pytest.raises(ValueError):
+    decodeEvent(b'\x7f' + record[1:])
+  with pytest.raises(ValueError):
+    encodeEvent(EDLEvent(-1))
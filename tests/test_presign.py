@@ -0,0 +1,211 @@
+import threading
+
+import pytest
+
+# The publisher needs PyNDN and the Google API client
+pytest.importorskip("pyndn")
+pytest.importorskip("apiclient")
+
+from concurrent.futures import Future
+
+from data_signer import DataSigner
+from dry_run import DryRun
+from lead_time import LeadTimeEstimator
+from url_translator import UrlTranslator
+
+class SlowTranslator(UrlTranslator):
+  """
+  Translates every URL in latency seconds of the loop's clock
+  """
+  def __init__(self, loop, latency):
+    UrlTranslator.__init__(self, loop, "http://localhost/translate")
+    self._latency = latency
+
+  def _submit(self, srcUrl):
+    future = self._loop.create_future()
+    self._loop.call_later(self._latency, future.set_result, srcUrl + "&translated")
+    return future
+
+def writeEDL(path, count):
+  """
+  Write an EDL of count 3 second events, one after the other, each of its own clip
+  """
+  lines = ["TITLE: presign", "FCM: NON-DROP FRAME", ""]
+  for i in range(count):
+    lines.append("%03d  AX       V     C        00:00:00:00 00:00:03:00 00:%02d:%02d:00 00:%02d:%02d:00" %
+      (i + 1, 3 * i // 60, 3 * i % 60, (3 * i + 3) // 60, (3 * i + 3) % 60))
+    lines.append("* FROM CLIP NAME: clip" + str(i) + ".mov")
+    lines.append("")
+  path.write_text("\n".join(lines) + "\n")
+  return str(path)
+
+class Run(object):
+  def __init__(self, tmp_path, count = 20, signAheadSeconds = 10):
+    self.dryRun = DryRun()
+    self.loop = self.dryRun.getLoop()
+    self.publisher = self.dryRun.getPublisher()
+    self.publisher._signAheadSeconds = signAheadSeconds
+    self.fileName = writeEDL(tmp_path / "cut.edl", count)
+    for i in range(count):
+      self.publisher._videoUrlDict["clip" + str(i)] = "v" + str(i)
+      self.cacheTranslation(i)
+    # Wait for each packet signed ahead, as the virtual clock does not wait for the signing thread
+    self.presigned = []
+    submit = self.publisher._dataSigner.submit
+    def submitAndWait(*args):
+      future = submit(*args)
+      future.exception()
+      self.presigned.append(future)
+      return future
+    self.publisher._dataSigner.submit = submitAndWait
+    self.published = []
+    self.publisher._onPublished = lambda seq, event, data: self.published.append((seq, event.eventId, data))
+
+  def cacheTranslation(self, i):
+    self.publisher._translationCache.put("https://www.youtube.com/watch?v=v" + str(i), "http://localhost/v" + str(i))
+
+  def getPresignedEventIds(self):
+    """
+    :return: The ids of the events published with the packet signed ahead for them
+    """
+    presigned = [future.result() for future in self.presigned if future.exception() is None]
+    return [eventId for _, eventId, data in self.published if any(data is packet for packet in presigned)]
+
+  def getPresignedCount(self):
+    return len(self.getPresignedEventIds())
+
+  def start(self, startOffset = 0):
+    self.publisher.parse(self.fileName)
+    self.publisher.schedulePublishing(startOffset)
+
+  def runUntil(self, time):
+    self.loop.call_at(time, self.loop.stop)
+    self.loop.run_forever()
+
+  def finish(self):
+    self.loop.run_forever()
+    assert self.loop.getErrorCount() == 0
+    names = [data.getName().toUri() for _, _, data in self.published]
+    assert names == [self.publisher._namePrefixString + str(seq) for seq in range(len(names))]
+
+def test_presigned_with_start_offset(tmp_path):
+  run = Run(tmp_path)
+  # Events 1 to 10 start before 30 sec and are skipped
+  run.start(30)
+  run.finish()
+  assert [eventId for _, eventId, _ in run.published[:-1]] == list(range(11, 21))
+  assert run.getPresignedCount() == 10
+
+def test_presigned_after_seek(tmp_path):
+  run = Run(tmp_path)
+  run.start()
+  run.runUntil(20)
+  published = len(run.published)
+  run.publisher.seekPublishing("00:00:45:00")
+  run.finish()
+  assert [eventId for _, eventId, _ in run.published[published:-1]] == list(range(16, 21))
+  assert run.getPresignedCount() == len(run.published) - 1
+
+def test_presigned_after_late_event(tmp_path):
+  run = Run(tmp_path)
+  run.publisher._urlTranslator = SlowTranslator(run.loop, 14)
+  # Event 5 is published when its translation finishes, after event 6
+  run.publisher._translationCache = type(run.publisher._translationCache)(":memory:")
+  for i in range(20):
+    if i != 4:
+      run.cacheTranslation(i)
+  run.start()
+  run.finish()
+  eventIds = [eventId for _, eventId, _ in run.published[:-1]]
+  assert eventIds.index(5) > eventIds.index(6)
+  # Only the events signed ahead while event 5 was still to be published miss
+  presigned = run.getPresignedEventIds()
+  assert set(range(1, 5)) | set(range(10, 21)) <= set(presigned)
+  assert 5 not in presigned
+
+def test_presigned_once_translated(tmp_path):
+  run = Run(tmp_path)
+  # Translations finish 5 sec before the publishing time, within the 10 sec sign ahead window
+  run.publisher._leadTimeEstimator = LeadTimeEstimator(defaultLeadTime = 6)
+  run.publisher._urlTranslator = SlowTranslator(run.loop, 1)
+  run.publisher._translationCache = type(run.publisher._translationCache)(":memory:")
+  run.start()
+  run.finish()
+  assert [row for row in run.published if row[2].getContent().toBytes().find(b"&translated") < 0] == [run.published[-1]]
+  # Events 1 and 2 are due at once, before their translations finish
+  assert sorted(run.getPresignedEventIds()) == list(range(3, 21))
+
+class FakeKeyChain(object):
+  """
+  Records the threads it signs on
+  """
+  def __init__(self):
+    self.threads = set()
+
+  def sign(self, data, certificateName):
+    self.threads.add(threading.current_thread().name)
+
+  def signWithSha256(self, data):
+    self.threads.add(threading.current_thread().name)
+
+def test_background_threads_sign_with_their_own_key_chain():
+  keyChain = FakeKeyChain()
+  backgroundKeyChains = []
+  def makeKeyChain():
+    backgroundKeyChains.append(FakeKeyChain())
+    return backgroundKeyChains[-1]
+  for digestOnly in (False, True):
+    del backgroundKeyChains[:]
+    signer = DataSigner(keyChain, "/cert", digestOnly, makeKeyChain = makeKeyChain)
+    data = signer.makeData("/test/0", "content", 1000)
+    assert data.getName().toUri() == "/test/0"
+    for seq in range(1, 5):
+      assert signer.submit("/test/" + str(seq), "content", 1000).result().getName().toUri() == "/test/" + str(seq)
+    signer.shutdown(True)
+    assert keyChain.threads == set([threading.current_thread().name])
+    # One per thread, never used from the calling thread
+    assert len(backgroundKeyChains) == 1
+    assert threading.current_thread().name not in backgroundKeyChains[0].threads
+
+def makeFuture(result = None, exception = None):
+  future = Future()
+  if exception is not None:
+    future.set_exception(exception)
+  else:
+    future.set_result(result)
+  return future
+
+def test_take_presigned_data():
+  publisher = DryRun().getPublisher()
+  packet = publisher._dataSigner.makeData("/test/3", "content", 1000)
+  publisher._presignedData[1] = (3, "content", makeFuture(packet))
+  assert publisher.takePresignedData(1, "content", 3) is packet
+  assert publisher.takePresignedData(1, "content", 3) is None
+
+  # The content changed since, e.g. by a translation finishing late
+  publisher._presignedData[1] = (3, "content", makeFuture(packet))
+  assert publisher.takePresignedData(1, "changed", 3) is None
+  assert 1 not in publisher._presignedData
+  # Another event was published under the expected sequence number
+  publisher._presignedData[1] = (3, "content", makeFuture(packet))
+  assert publisher.takePresignedData(1, "content", 4) is None
+  # Signing failed
+  publisher._presignedData[1] = (3, "content", makeFuture(exception = RuntimeError("no key")))
+  assert publisher.takePresignedData(1, "content", 3) is None
+  # Not signed yet
+  pending = Future()
+  publisher._presignedData[1] = (3, "content", pending)
+  assert publisher.takePresignedData(1, "content", 3) is None
+  assert pending.cancelled()
+
+def test_failed_presign_signed_at_publication(tmp_path):
+  run = Run(tmp_path)
+  def submitFailing(*args):
+    run.presigned.append(makeFuture(exception = RuntimeError("no key")))
+    return run.presigned[-1]
+  run.publisher._dataSigner.submit = submitFailing
+  run.start()
+  run.finish()
+  assert len(run.presigned) == 20
+  assert len(run.published) == 21
+  assert run.getPresignedCount() == 0
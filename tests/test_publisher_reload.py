@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+# The publisher needs PyNDN and the Google API client
+pytest.importorskip("pyndn")
+pytest.importorskip("apiclient")
+
+from dry_run import DryRun
+from url_translator import UrlTranslator
+
+class ManualTranslator(UrlTranslator):
+  """
+  Leaves every translation in flight until the test completes it
+  """
+  def __init__(self, loop):
+    UrlTranslator.__init__(self, loop, "http://localhost/translate")
+    self.requests = dict()
+
+  def _submit(self, srcUrl):
+    future = self._loop.create_future()
+    self.requests[srcUrl] = future
+    return future
+
+  def complete(self, clip):
+    self.requests.pop(sourceUrl(clip)).set_result(videoUrl(clip))
+
+def sourceUrl(clip):
+  return "https://www.youtube.com/watch?v=" + clip
+
+def videoUrl(clip):
+  return "http://localhost/video/" + clip
+
+def writeEDL(path, clips):
+  """
+  Write an EDL of one 3 second event per clip, event i + 1 for clips[i]
+  """
+  lines = ["TITLE: reload", "FCM: NON-DROP FRAME", ""]
+  for i, clip in enumerate(clips):
+    lines.append("%03d  AX       V     C        00:00:00:00 00:00:03:00 00:00:%02d:00 00:00:%02d:00" %
+      (i + 1, 3 * i, 3 * i + 3))
+    lines.append("* FROM CLIP NAME: " + clip + ".mov")
+    lines.append("")
+  path.write_text("\n".join(lines) + "\n")
+  return path.read_text().splitlines(True)
+
+class Run(object):
+  def __init__(self, tmp_path, clips):
+    self.path = tmp_path / "cut.edl"
+    writeEDL(self.path, clips)
+    self.dryRun = DryRun()
+    self.loop = self.dryRun.getLoop()
+    self.publisher = self.dryRun.getPublisher()
+    self.translator = ManualTranslator(self.loop)
+    self.publisher._urlTranslator = self.translator
+    self.publisher._videoUrlDict.update((clip, clip) for clip in "abcdef")
+    self.published = []
+    self.publisher._onPublished = self.onPublished
+    self.publisher.parse(str(self.path))
+    self.publisher.watchEDL(str(self.path), 3600)
+    self.publisher.schedulePublishing()
+
+  def onPublished(self, seq, event, data):
+    self.published.append(json.loads(self.publisher.encodeContent(event, "json")))
+
+  def runUntil(self, time):
+    self.loop.call_at(time, self.loop.stop)
+    self.loop.run_forever()
+
+  def reload(self, clips):
+    self.publisher.reloadEDL(writeEDL(self.path, clips))
+    # Let the rescheduled translations start
+    self.runUntil(self.loop.time() + 1)
+
+  def finish(self):
+    self.loop.run_forever()
+    assert self.loop.getErrorCount() == 0
+    assert self.published[-1]["src_url"] == "end"
+    return dict((payload["event_id"], payload) for payload in self.published)
+
+def test_append(tmp_path):
+  run = Run(tmp_path, "abc")
+  run.runUntil(1)
+  run.reload("abcd")
+  for clip in "abcd":
+    run.translator.complete(clip)
+  published = run.finish()
+  assert published["4"]["src_url"] == videoUrl("d")
+  assert published["5"]["src_url"] == "end"
+  assert len(run.published) == 5
+
+def test_remove_last(tmp_path):
+  run = Run(tmp_path, "abc")
+  run.runUntil(1)
+  run.reload("ab")
+  for clip in "abc":
+    run.translator.complete(clip)
+  published = run.finish()
+  assert sorted(published) == ["1", "2", "4"]
+  assert published["4"] == {"event_id": "4", "src_url": "end", "translated": "not-required"}
+
+def test_modify_drops_stale_translation(tmp_path):
+  run = Run(tmp_path, "abc")
+  run.runUntil(1)
+  run.reload("aec")
+  run.translator.complete("b")
+  for clip in "ace":
+    run.translator.complete(clip)
+  published = run.finish()
+  assert [payload["src_url"] for payload in run.published if payload["event_id"] == "2"] == [videoUrl("e")]
+  assert sorted(published) == ["1", "2", "3", "4"]
+
+def test_translation_of_removed_event_leaves_others(tmp_path):
+  # Events 2 and 3 share the clip, so both wait on the same request
+  run = Run(tmp_path, "abb")
+  run.runUntil(1)
+  run.reload("ab")
+  for clip in "ab":
+    run.translator.complete(clip)
+  published = run.finish()
+  assert published["2"]["src_url"] == videoUrl("b")
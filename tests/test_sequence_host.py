@@ -0,0 +1,72 @@
+import pytest
+
+# The publisher needs PyNDN and the Google API client
+pytest.importorskip("pyndn")
+pytest.importorskip("apiclient")
+
+from dry_run import DRY_RUN_VIDEO_URL, TranslationStub, VirtualClockLoop, makeMemoryKeyChain
+from edl_consumer import EDLConsumer
+from local_face import LocalFace
+from test_edl_parser import EDLSequenceHost, NaiveEDLParserAndPublisher
+
+def writeEDL(path, clips):
+  """
+  Write an EDL of one 3 second event per clip, event i + 1 for clips[i]
+  """
+  lines = ["TITLE: host", "FCM: NON-DROP FRAME", ""]
+  for i, clip in enumerate(clips):
+    lines.append("%03d  AX       V     C        00:00:00:00 00:00:03:00 00:00:%02d:00 00:00:%02d:00" %
+      (i + 1, 3 * i, 3 * i + 3))
+    lines.append("* FROM CLIP NAME: " + clip + ".mov")
+    lines.append("")
+  path.write_text("\n".join(lines) + "\n")
+  return str(path)
+
+def test_shared_publisher_runs_on_the_loop_of_the_other(tmp_path):
+  loop = VirtualClockLoop()
+  root = NaiveEDLParserAndPublisher(False, loop = loop, face = LocalFace(loop), keyChain = makeMemoryKeyChain(),
+    translationCachePath = ":memory:")
+  root._urlTranslator = TranslationStub(loop, seed = 1)
+  root._videoUrlDict.update((clip, clip) for clip in "abc")
+  publisher = NaiveEDLParserAndPublisher(False, shareWith = root)
+  published = []
+  publisher._onPublished = lambda seq, event, data: published.append((data.getName().toUri(), event.srcUrl))
+  publisher.parse(writeEDL(tmp_path / "cut.edl", "abc"))
+  publisher.schedulePublishing()
+  loop.run_forever()
+  assert loop.getErrorCount() == 0
+  assert [name for name, _ in published] == [root._namePrefixString + str(seq) for seq in range(4)]
+  assert published[-1][1] == "end"
+
+def makeHost(loop, face):
+  host = EDLSequenceHost(False, loop = loop, face = face, keyChain = makeMemoryKeyChain(),
+    translationCachePath = ":memory:")
+  host._root._urlTranslator = TranslationStub(loop, seed = 1)
+  host._root._videoUrlDict.update((clip, clip) for clip in "abcdef")
+  return host
+
+def test_sequences_share_one_face(tmp_path):
+  loop = VirtualClockLoop()
+  face = LocalFace(loop)
+  host = makeHost(loop, face)
+  host.addSequence("first", writeEDL(tmp_path / "first.edl", "abc"))
+  host.addSequence("second", writeEDL(tmp_path / "second.edl", "defab"))
+  # Both sequences are fetched from the face, under the prefix registered once by the host
+  fetched = dict()
+  ended = []
+  for name in host.getSequenceNames():
+    fetched[name] = []
+    consumer = EDLConsumer(face, host._root._namePrefixString + name + "/",
+      onEvent = lambda seq, event, name = name: fetched[name].append(event),
+      onEnd = lambda name = name: ended.append(name), loop = loop)
+    consumer.start()
+  assert host.startPublishing().done()
+  loop.run_forever()
+
+  assert loop.getErrorCount() == 0
+  assert host._finished == set(["first", "second"])
+  assert sorted(ended) == ["first", "second"]
+  assert [event["event_id"] for event in fetched["first"]] == ["1", "2", "3", "4"]
+  assert [event["event_id"] for event in fetched["second"]] == ["1", "2", "3", "4", "5", "6"]
+  assert fetched["second"][-1]["src_url"] == "end"
+  assert fetched["second"][0]["src_url"].startswith(DRY_RUN_VIDEO_URL)
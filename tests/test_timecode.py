@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from timecode import FrameRate, framesToTimecodes, timecodesToFrames, timecodeSecondsBatch, subtractFrames
+
+RATES = [FrameRate(24), FrameRate(25), FrameRate(30), FrameRate(29.97, True), FrameRate(59.94, True)]
+
+def randomFrames(rate, count = 2000):
+  rand = random.Random(rate.nominal)
+  return [rand.randint(0, 24 * 3600 * rate.nominal - 1) for _ in range(count)]
+
+@pytest.mark.parametrize("rate", RATES, ids = repr)
+def test_round_trip(rate):
+  for frames in randomFrames(rate, 200):
+    assert rate.toFrames(rate.toTimecode(frames)) == frames
+
+def test_drop_frame_skips_frame_numbers():
+  rate = FrameRate(29.97, True)
+  assert rate.toTimecode(1799) == "00:00:59;29"
+  assert rate.toTimecode(1800) == "00:01:00;02"
+  # Every tenth minute keeps frame numbers 0 and 1
+  assert rate.toTimecode(17982) == "00:10:00;00"
+
+def test_audio_sample_count():
+  assert FrameRate(30).toFrames("00:00:06:24000") == 6 * 30 + 15
+
+@pytest.mark.parametrize("rate", RATES, ids = repr)
+def test_batch_matches_scalar(rate):
+  frames = randomFrames(rate)
+  timecodes = [rate.toTimecode(f) for f in frames]
+  assert list(framesToTimecodes(frames, rate)) == timecodes
+  assert list(framesToTimecodes(frames, rate, False)) == [rate.toTimecode(f, False) for f in frames]
+  assert list(timecodesToFrames(timecodes, rate)) == frames
+  assert list(timecodeSecondsBatch(frames, rate)) == [rate.timecodeSeconds(f) for f in frames]
+
+def test_batch_irregular_timecodes():
+  rate = FrameRate(30)
+  timecodes = ["01:00:00:00", "00:00:06:22120", "1:2:3:4", "00:00:01;05"]
+  assert list(timecodesToFrames(timecodes, rate)) == [rate.toFrames(t) for t in timecodes]
+  assert list(timecodesToFrames([], rate)) == []
+  assert list(framesToTimecodes([], rate)) == []
+
+def test_subtract_frames():
+  rate = FrameRate(30)
+  assert subtractFrames(rate.toFrames("01:00:00:00"), rate.toFrames("01:00:10:00"), rate) == 300
+  assert subtractFrames(rate.toFrames("01:00:10:00"), rate.toFrames("01:00:00:00"), rate) is None
+  # Beyond the clip length expected
+  assert subtractFrames(0, rate.toFrames("00:05:00:00"), rate) is None
@@ -0,0 +1,89 @@
+import sqlite3
+import time
+
+import pytest
+
+from translation_cache import TranslationCache
+
+# Not patched by the clock fixture
+realTime = time.time
+
+class Clock(object):
+  def __init__(self):
+    self.now = 1000.0
+
+  def __call__(self):
+    return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+  clock = Clock()
+  monkeypatch.setattr(time, "time", clock)
+  return clock
+
+def test_get_put(tmp_path, clock):
+  cache = TranslationCache(str(tmp_path / "cache.db"))
+  assert cache.get("ori") is None
+  cache.put("ori", "src")
+  assert cache.get("ori") == "src"
+  cache.put("ori", "src2")
+  assert cache.get("ori") == "src2"
+  assert (cache.getHitCount(), cache.getMissCount(), len(cache)) == (2, 1, 1)
+  cache.close()
+
+def test_entries_expire(tmp_path, clock):
+  cache = TranslationCache(str(tmp_path / "cache.db"), ttl = 60)
+  cache.put("a", "srcA")
+  clock.now += 30
+  cache.put("b", "srcB")
+  clock.now += 31
+  # Reading an entry does not extend its lifetime
+  assert cache.get("a") is None
+  assert cache.get("b") == "srcB"
+  clock.now += 30
+  assert cache.purgeExpired() == 1
+  assert len(cache) == 0
+  cache.close()
+
+def test_least_recently_used_evicted(tmp_path, clock):
+  cache = TranslationCache(str(tmp_path / "cache.db"), maxEntries = 2)
+  cache.put("a", "srcA")
+  clock.now += 1
+  cache.put("b", "srcB")
+  clock.now += 1
+  assert cache.get("a") == "srcA"
+  clock.now += 1
+  cache.put("c", "srcC")
+  assert len(cache) == 2
+  assert cache.get("b") is None
+  assert cache.get("a") == "srcA"
+  assert cache.get("c") == "srcC"
+  cache.close()
+
+def test_shared_between_connections(tmp_path, clock):
+  path = str(tmp_path / "cache.db")
+  writer = TranslationCache(path)
+  reader = TranslationCache(path)
+  writer.put("ori", "src")
+  assert reader.get("ori") == "src"
+  writer.close()
+  reader.close()
+
+def test_locked_database_does_not_block(tmp_path, clock):
+  path = str(tmp_path / "cache.db")
+  cache = TranslationCache(path, lockTimeout = 0.01)
+  cache.put("a", "srcA")
+  # Another process holds the write lock
+  other = sqlite3.connect(path, isolation_level = None)
+  other.execute("BEGIN IMMEDIATE")
+  start = realTime()
+  cache.put("b", "srcB")
+  assert cache.get("a") == "srcA"
+  assert cache.get("b") is None
+  assert realTime() - start < 1
+  assert cache.getLockedCount() == 2
+  other.execute("ROLLBACK")
+  other.close()
+  cache.put("b", "srcB")
+  assert cache.get("b") == "srcB"
+  cache.close()
@@ -0,0 +1,208 @@
+import json
+import threading
+import time
+
+import pytest
+
+try:
+  from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+  from SocketServer import ThreadingMixIn
+  from urlparse import parse_qs
+except ImportError:
+  from http.server import BaseHTTPRequestHandler, HTTPServer
+  from socketserver import ThreadingMixIn
+  from urllib.parse import parse_qs
+
+try:
+  import asyncio
+except ImportError:
+  import trollius as asyncio
+
+from url_translator import UrlTranslator
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+  daemon_threads = True
+
+class TranslationService(object):
+  """
+  A local translation service answering the URL posted with it + "&played".
+  URLs containing "slow" take delay seconds, and requests wait while the
+  gate is closed.
+  """
+  def __init__(self, delay = 1.0, status = 200):
+    self.delay = delay
+    self.status = status
+    self.gate = threading.Event()
+    self.gate.set()
+    # (src_url, client port) in the order received
+    self.requests = []
+    self.active = 0
+    self.maxActive = 0
+    self._lock = threading.Lock()
+    self._server = _ThreadingHTTPServer(("127.0.0.1", 0), self._makeHandler())
+    thread = threading.Thread(target = self._server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+  def getUrl(self):
+    return "http://127.0.0.1:" + str(self._server.server_address[1]) + "/get-youtube-url"
+
+  def close(self):
+    self._server.shutdown()
+    self._server.server_close()
+
+  def _makeHandler(self):
+    service = self
+    class Handler(BaseHTTPRequestHandler):
+      protocol_version = "HTTP/1.1"
+
+      def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode('utf-8')
+        srcUrl = parse_qs(body)['url'][0]
+        with service._lock:
+          service.requests.append((srcUrl, self.client_address[1]))
+          service.active += 1
+          service.maxActive = max(service.maxActive, service.active)
+        service.gate.wait()
+        if "slow" in srcUrl:
+          time.sleep(service.delay)
+        time.sleep(0.02)
+        with service._lock:
+          service.active -= 1
+        result = (srcUrl + "&played").encode('utf-8')
+        self.send_response(service.status)
+        self.send_header("Content-Length", str(len(result)))
+        self.end_headers()
+        self.wfile.write(result)
+
+      def log_message(self, format, *args):
+        pass
+    return Handler
+
+@pytest.fixture
+def service():
+  service = TranslationService()
+  yield service
+  service.gate.set()
+  service.close()
+
+@pytest.fixture
+def eventLoop():
+  loop = asyncio.new_event_loop()
+  yield loop
+  loop.close()
+
+class Results(object):
+  def __init__(self, loop):
+    self._loop = loop
+    # (src_url, translated URL or exception) in the order the callbacks were called
+    self.results = []
+
+  def translate(self, translator, srcUrl, deadline = None):
+    translator.translate(srcUrl, lambda videoUrl: self.results.append((srcUrl, videoUrl)),
+      lambda exception: self.results.append((srcUrl, exception)), deadline)
+
+  def waitFor(self, count, timeout = 10):
+    end = time.time() + timeout
+    while len(self.results) < count and time.time() < end:
+      self._loop.run_until_complete(asyncio.sleep(0.01))
+    assert len(self.results) == count
+    return dict(self.results)
+
+def test_translate_shares_concurrent_requests(service, eventLoop):
+  translator = UrlTranslator(eventLoop, service.getUrl())
+  results = Results(eventLoop)
+  for _ in range(3):
+    results.translate(translator, "https://www.youtube.com/watch?v=a")
+  assert translator.getInFlightCount() == 1
+  assert results.waitFor(3) == {"https://www.youtube.com/watch?v=a": "https://www.youtube.com/watch?v=a&played"}
+  assert len(service.requests) == 1
+  assert translator.getInFlightCount() == 0
+  translator.shutdown(True)
+
+def test_concurrency_cap_and_keep_alive(service, eventLoop):
+  translator = UrlTranslator(eventLoop, service.getUrl(), maxConcurrency = 2)
+  results = Results(eventLoop)
+  for i in range(8):
+    results.translate(translator, "v" + str(i))
+  assert translator.getQueuedCount() == 6
+  assert len(results.waitFor(8)) == 8
+  assert service.maxActive == 2
+  # Each worker keeps its connection
+  assert len(set(port for _, port in service.requests)) == 2
+  translator.shutdown(True)
+
+def test_waiting_requests_by_deadline(service, eventLoop):
+  translator = UrlTranslator(eventLoop, service.getUrl(), maxConcurrency = 1)
+  results = Results(eventLoop)
+  service.gate.clear()
+  results.translate(translator, "first")
+  now = eventLoop.time()
+  results.translate(translator, "later", now + 30)
+  results.translate(translator, "soon", now + 10)
+  results.translate(translator, "anytime")
+  results.translate(translator, "missed", now - 1)
+  results.translate(translator, "sooner", now + 20)
+  # Moved earlier by a second request for the same URL
+  results.translate(translator, "later", now + 5)
+  service.gate.set()
+  results.waitFor(7)
+  # Requests past their deadline wait for the ones that can still make theirs
+  assert [srcUrl for srcUrl, _ in service.requests] == ["first", "later", "soon", "sooner", "anytime", "missed"]
+  translator.shutdown(True)
+
+def test_request_timeout(service, eventLoop):
+  translator = UrlTranslator(eventLoop, service.getUrl(), maxConcurrency = 1, timeout = 0.2)
+  results = Results(eventLoop)
+  results.translate(translator, "slow")
+  results.translate(translator, "fast")
+  translated = results.waitFor(2)
+  assert isinstance(translated["slow"], IOError)
+  # Another connection is opened for the next request
+  assert translated["fast"] == "fast&played"
+  translator.shutdown(True)
+
+def test_service_error(eventLoop):
+  service = TranslationService(status = 500)
+  try:
+    translator = UrlTranslator(eventLoop, service.getUrl())
+    results = Results(eventLoop)
+    results.translate(translator, "a")
+    results.translate(translator, "a")
+    translated = results.waitFor(2)
+    assert isinstance(translated["a"], IOError)
+    translator.shutdown(True)
+  finally:
+    service.close()
+
+def test_publisher_falls_back_to_untranslated_url(tmp_path):
+  # The publisher needs PyNDN and the Google API client
+  pytest.importorskip("pyndn")
+  pytest.importorskip("apiclient")
+  from dry_run import DryRun
+
+  service = TranslationService(status = 500)
+  try:
+    path = tmp_path / "cut.edl"
+    path.write_text("TITLE: fallback\n\n"
+      "001  AX       V     C        00:00:00:00 00:00:03:00 00:00:10:00 00:00:13:00\n"
+      "* FROM CLIP NAME: Found.mov\n\n"
+      "002  AX       V     C        00:00:00:00 00:00:03:00 00:00:13:00 00:00:16:00\n"
+      "* FROM CLIP NAME: Missing.mov\n")
+    dryRun = DryRun()
+    publisher = dryRun.getPublisher()
+    publisher._urlTranslator = UrlTranslator(dryRun.getLoop(), service.getUrl())
+    publisher._videoUrlDict["found"] = "v0"
+    published = []
+    publisher._onPublished = lambda seq, event, data: published.append(json.loads(publisher.encodeContent(event, "json")))
+    publisher.parse(str(path))
+    publisher.schedulePublishing()
+    dryRun.getLoop().run_forever()
+    # Published with the untranslated URL, or "none" without a video, rather than never
+    assert dict((event["event_id"], (event["src_url"], event["translated"])) for event in published) == {
+      "1": ("https://www.youtube.com/watch?v=v0", "failed"),
+      "2": ("none", "non-existent"),
+      "3": ("end", "not-required")
+    }
+  finally:
+    service.close()
@@ -0,0 +1,61 @@
+import threading
+
+from video_catalog import loadCatalog
+
+def listing(titles, wait = None):
+  def fetchTitles():
+    if wait is not None:
+      assert wait.wait(5)
+    return titles
+  return fetchTitles
+
+def test_load_catalog():
+  catalog = loadCatalog([
+    ("main", listing({"Kitchen Wall GFX": "v1", "Drone River": "v2"})),
+    ("archive", listing({"Market Crowd": "v3"})),
+  ])
+  assert len(catalog) == 3
+  assert catalog.getVideoUrlDict() == {"kitchen wall gfx": "v1", "drone river": "v2", "market crowd": "v3"}
+  assert catalog.getChannel("Market Crowd") == "archive"
+  assert catalog.getFailedChannels() == []
+
+def test_title_matched_case_insensitively():
+  catalog = loadCatalog([("main", listing({"Kitchen Wall GFX": "v1"}))])
+  assert catalog.getVideoId("kitchen WALL gfx") == "v1"
+  assert catalog.getChannel("KITCHEN WALL GFX") == "main"
+  assert catalog.getVideoId("kitchen wall") is None
+  assert catalog.getChannel("kitchen wall") is None
+
+def test_first_listed_channel_wins():
+  # The first channel finishes listing last
+  archiveListed = threading.Event()
+  def fetchArchive():
+    archiveListed.set()
+    return {"drone river": "v9", "market crowd": "v3"}
+  catalog = loadCatalog([
+    ("main", listing({"Drone River": "v2"}, archiveListed)),
+    ("archive", fetchArchive),
+  ])
+  assert catalog.getVideoId("Drone River") == "v2"
+  assert catalog.getChannel("Drone River") == "main"
+  assert catalog.getCollisions() == {"drone river": [("v9", "archive")]}
+
+def test_failed_and_malformed_channels_left_out():
+  def fetchRevoked():
+    raise IOError("invalid_grant")
+  catalog = loadCatalog([
+    ("revoked", fetchRevoked),
+    ("malformed", listing([("Drone River", "v2")])),
+    ("empty", listing(None)),
+    ("main", listing({"Kitchen Wall GFX": "v1"})),
+  ])
+  assert catalog.getVideoUrlDict() == {"kitchen wall gfx": "v1"}
+  failed = catalog.getFailedChannels()
+  assert [channel for channel, e in failed] == ["revoked", "malformed", "empty"]
+  assert isinstance(failed[0][1], IOError)
+  assert all(isinstance(e, ValueError) for channel, e in failed[1:])
+
+def test_no_channels():
+  catalog = loadCatalog([])
+  assert len(catalog) == 0
+  assert catalog.getVideoId("anything") is None
@@ -0,0 +1,278 @@
+import re
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+# Audio clips in Premiere batch lists carry the sub-second field as a 48kHz
+# sample count ("00:00:06:22120") instead of a frame number
+AUDIO_SAMPLE_RATE = 48000
+
+_fcmRegex = re.compile(r'FCM:\s*(DROP|NON-DROP) FRAME')
+
+class FrameRate(object):
+  """
+  A timecode base: the actual frame rate, the nominal (integer) frame rate
+  timecodes are counted in, and whether drop-frame counting is used.
+  Supported rates are 23.976, 24, 25, 29.97, 30, 59.94 and 60; drop-frame
+  counting only exists for 29.97 and 59.94.
+  """
+  __slots__ = ('fps', 'nominal', 'dropFrame', '_dropFrames', '_framesPerMinute', '_framesPer10Minutes')
+
+  def __init__(self, fps = 30, dropFrame = False):
+    self.fps = float(fps)
+    self.nominal = int(round(self.fps))
+    if self.nominal not in (24, 25, 30, 60):
+      raise ValueError("Unsupported frame rate " + str(fps))
+    if dropFrame and self.nominal not in (30, 60):
+      raise ValueError("Drop frame timecode is not defined for " + str(fps) + " fps")
+    self.dropFrame = dropFrame
+
+    # Drop-frame counting skips frame numbers 0 and 1 (0-3 at 59.94) at the
+    # start of every minute, except every tenth minute
+    self._dropFrames = self.nominal // 15 if dropFrame else 0
+    self._framesPerMinute = self.nominal * 60 - self._dropFrames
+    self._framesPer10Minutes = self.nominal * 600 - self._dropFrames * 9
+
+  def withFCM(self, dropFrame):
+    """
+    :return: The frame rate matching an EDL "FCM:" header; drop frame at a
+      nominal 30 or 60 fps means 29.97 or 59.94
+    :rtype: FrameRate
+    """
+    if dropFrame == self.dropFrame:
+      return self
+    if dropFrame:
+      return FrameRate(self.nominal * 1000 / 1001.0, True)
+    return FrameRate(self.fps, False)
+
+  def componentsToFrames(self, hours, minutes, seconds, frameNumber):
+    totalMinutes = hours * 60 + minutes
+    frames = (totalMinutes * 60 + seconds) * self.nominal + frameNumber
+    if self._dropFrames:
+      frames -= self._dropFrames * (totalMinutes - totalMinutes // 10)
+    return frames
+
+  def toFrames(self, timecode):
+    """
+    Convert an "HH:MM:SS:FF" (or "HH:MM:SS;FF") timecode into an absolute frame count
+    :rtype: int
+    """
+    timeStrs = timecode.replace(';', ':').split(':')
+    frameStr = timeStrs[3]
+    if len(frameStr) > 2:
+      frameNumber = int(frameStr) * self.nominal // AUDIO_SAMPLE_RATE
+    else:
+      frameNumber = int(frameStr)
+    return self.componentsToFrames(int(timeStrs[0]), int(timeStrs[1]), int(timeStrs[2]), frameNumber)
+
+  def toComponents(self, frames):
+    """
+    :return: (hours, minutes, seconds, frameNumber) for an absolute frame count
+    :rtype: tuple
+    """
+    if self._dropFrames:
+      tens, remainder = divmod(frames, self._framesPer10Minutes)
+      frames += self._dropFrames * 9 * tens
+      if remainder > self._dropFrames:
+        frames += self._dropFrames * ((remainder - self._dropFrames) // self._framesPerMinute)
+    seconds, frameNumber = divmod(frames, self.nominal)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return (hours, minutes, seconds, frameNumber)
+
+  def toTimecode(self, frames, padded = True):
+    """
+    Convert an absolute frame count into a timecode string; drop-frame
+    timecodes use ';' before the frame field. If padded is False, fields are
+    not zero-padded ("0:1:5:12"), the format adjusted source times have
+    always been published in.
+    """
+    fmt = "%02d:%02d:%02d" if padded else "%d:%d:%d"
+    fmt += (";" if self.dropFrame else ":") + ("%02d" if padded else "%d")
+    return fmt % self.toComponents(frames)
+
+  def toSeconds(self, frames):
+    """
+    :return: The wall clock time in seconds for an absolute frame count
+    :rtype: float
+    """
+    return frames / self.fps
+
+  def timecodeSeconds(self, frames):
+    """
+    :return: The whole seconds shown in the timecode of an absolute frame count
+    :rtype: int
+    """
+    hours, minutes, seconds, _ = self.toComponents(frames)
+    return (hours * 60 + minutes) * 60 + seconds
+
+  def __eq__(self, other):
+    return isinstance(other, FrameRate) and self.fps == other.fps and self.dropFrame == other.dropFrame
+
+  def __ne__(self, other):
+    return not self == other
+
+  def __hash__(self):
+    return hash((self.fps, self.dropFrame))
+
+  def __repr__(self):
+    return "FrameRate(" + str(self.fps) + (", DF" if self.dropFrame else "") + ")"
+
+def parseFCM(line):
+  """
+  :return: True for an "FCM: DROP FRAME" line, False for "FCM: NON-DROP FRAME", None otherwise
+  """
+  match = _fcmRegex.match(line)
+  if match is None:
+    return None
+  return match.group(1) == "DROP"
+
+def subtractFrames(base, frames, rate):
+  """
+  Offset a source time by the start of its clip, rejecting results that are
+  negative or beyond the clip length we expect (more than 1:01:xx:xx)
+  :return: The adjusted frame count, or None if the adjustment is invalid
+  """
+  result = frames - base
+  if result < 0:
+    print("Warning: time minus smaller than 0")
+    return None
+  hours, minutes, _, _ = rate.toComponents(result)
+  # Arbitrary guard of start times that are off
+  if hours > 1 or minutes > 1:
+    return None
+  return result
+
+class EventTable(object):
+  """
+  Column-oriented view of the timing of a set of events, so that
+  scheduling is done as array operations instead of per-event arithmetic.
+  Uses NumPy arrays when NumPy is available and plain lists otherwise.
+  """
+  def __init__(self, events):
+    self.eventIds = [event.eventId for event in events]
+    self.srcStart = _makeArray([event.srcStart for event in events])
+    self.srcEnd = _makeArray([event.srcEnd for event in events])
+    self.dstStart = _makeArray([event.dstStart for event in events])
+    self.dstEnd = _makeArray([event.dstEnd for event in events])
+    # An EDL may switch between drop and non-drop frame; each column is
+    # converted one frame rate group at a time
+    self._rateGroups = dict()
+    for idx, event in enumerate(events):
+      self._rateGroups.setdefault(event.rate, []).append(idx)
+
+  def __len__(self):
+    return len(self.eventIds)
+
+  def timecodeSeconds(self, column):
+    """
+    :return: The whole seconds shown in the timecodes of a column, such as self.dstStart
+    """
+    if len(self._rateGroups) == 1:
+      rate, = self._rateGroups
+      return timecodeSecondsBatch(column, rate)
+    result = _makeArray([0] * len(column))
+    for rate, indices in self._rateGroups.items():
+      if numpy is not None:
+        result[indices] = timecodeSecondsBatch(column[indices], rate)
+      else:
+        seconds = timecodeSecondsBatch([column[idx] for idx in indices], rate)
+        for idx, value in zip(indices, seconds):
+          result[idx] = value
+    return result
+
+  def scheduledTimes(self, beforeSeconds):
+    """
+    :return: Seconds from the start of publishing at which each event is
+      due, beforeSeconds ahead of its destination start time, clamped at 0
+    """
+    seconds = self.timecodeSeconds(self.dstStart)
+    if numpy is not None:
+      return numpy.maximum(seconds - beforeSeconds, 0)
+    return [max(s - beforeSeconds, 0) for s in seconds]
+
+def _makeArray(values):
+  if numpy is not None:
+    return numpy.asarray(values, dtype = numpy.int64)
+  return list(values)
+
+# Character columns of the fields of an "HH:MM:SS:FF" timecode
+_TENS_COLUMNS = [0, 3, 6, 9]
+_UNITS_COLUMNS = [1, 4, 7, 10]
+_SEPARATOR_COLUMNS = [2, 5, 8]
+
+def timecodesToFrames(timecodes, rate):
+  """
+  Batch-convert a sequence of timecode strings into absolute frame counts.
+  "HH:MM:SS:FF" timecodes are decoded from an array of their character
+  codes; any others (audio sample counts, unpadded fields) one at a time.
+  """
+  if numpy is None:
+    return [rate.toFrames(timecode) for timecode in timecodes]
+  if len(timecodes) == 0:
+    return numpy.zeros(0, dtype = numpy.int64)
+  strings = numpy.ascontiguousarray(timecodes)
+  if strings.dtype.kind not in "SU" or strings.dtype.itemsize < 11 * (4 if strings.dtype.kind == "U" else 1):
+    return numpy.array([rate.toFrames(str(timecode)) for timecode in strings], dtype = numpy.int64)
+  codes = strings.view(numpy.uint32 if strings.dtype.kind == "U" else numpy.uint8).reshape(len(strings), -1)
+  digits = codes[:, :11].astype(numpy.int64) - ord('0')
+  tens = digits[:, _TENS_COLUMNS]
+  units = digits[:, _UNITS_COLUMNS]
+  separators = codes[:, _SEPARATOR_COLUMNS]
+  regular = ((tens >= 0) & (tens <= 9) & (units >= 0) & (units <= 9)).all(axis = 1)
+  regular &= ((separators == ord(':')) | (separators == ord(';'))).all(axis = 1)
+  if codes.shape[1] > 11:
+    regular &= (codes[:, 11:] == 0).all(axis = 1)
+  fields = tens * 10 + units
+  frames = rate.componentsToFrames(fields[:, 0], fields[:, 1], fields[:, 2], fields[:, 3])
+  for idx in numpy.flatnonzero(~regular):
+    frames[idx] = rate.toFrames(str(strings[idx]))
+  return frames
+
+def framesToComponentsBatch(frames, rate):
+  """
+  Batch version of FrameRate.toComponents; returns four arrays
+  """
+  if numpy is None:
+    return tuple(zip(*[rate.toComponents(f) for f in frames])) or ([], [], [], [])
+  frames = numpy.asarray(frames, dtype = numpy.int64)
+  if rate.dropFrame:
+    drop = rate._dropFrames
+    tens, remainder = numpy.divmod(frames, rate._framesPer10Minutes)
+    frames = frames + drop * 9 * tens + numpy.where(remainder > drop,
+      drop * ((remainder - drop) // rate._framesPerMinute), 0)
+  seconds, frameNumbers = numpy.divmod(frames, rate.nominal)
+  minutes, seconds = numpy.divmod(seconds, 60)
+  hours, minutes = numpy.divmod(minutes, 60)
+  return (hours, minutes, seconds, frameNumbers)
+
+def framesToTimecodes(frames, rate, padded = True):
+  """
+  Batch-convert absolute frame counts into timecode strings. Padded
+  timecodes are written into an array of character codes, two digits per field.
+  """
+  if numpy is None:
+    return [rate.toTimecode(f, padded) for f in frames]
+  fields = numpy.stack(framesToComponentsBatch(frames, rate), axis = 1)
+  if not padded or (len(fields) > 0 and (fields.min() < 0 or fields[:, 0].max() > 99)):
+    fmt = "%02d:%02d:%02d" if padded else "%d:%d:%d"
+    fmt += (";" if rate.dropFrame else ":") + ("%02d" if padded else "%d")
+    return [fmt % tuple(row) for row in fields.tolist()]
+  codes = numpy.empty((len(fields), 11), dtype = numpy.uint8)
+  codes[:, _TENS_COLUMNS] = fields // 10 + ord('0')
+  codes[:, _UNITS_COLUMNS] = fields % 10 + ord('0')
+  codes[:, _SEPARATOR_COLUMNS] = ord(':')
+  if rate.dropFrame:
+    codes[:, 8] = ord(';')
+  return codes.view("S11").ravel().astype(str).tolist()
+
+def timecodeSecondsBatch(frames, rate):
+  """
+  Batch version of FrameRate.timecodeSeconds
+  """
+  hours, minutes, seconds, _ = framesToComponentsBatch(frames, rate)
+  if numpy is None:
+    return [(h * 60 + m) * 60 + s for h, m, s in zip(hours, minutes, seconds)]
+  return (hours * 60 + minutes) * 60 + seconds
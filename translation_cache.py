@@ -0,0 +1,121 @@
+import sqlite3
+import time
+
+class TranslationCache(object):
+  """
+  On-disk cache of translation service results (ori_url -> translated src_url),
+  shared safely between publisher processes through SQLite's file locking.
+  Entries expire after ttl seconds and the least recently used entries are
+  evicted once there are more than maxEntries.
+
+  The cache is used on the event loop, so it does not wait for the database
+  lock held by another process for longer than lockTimeout: a lookup then
+  misses, and an entry is not stored.
+  """
+  def __init__(self, path, ttl = 24 * 3600, maxEntries = 10000, lockTimeout = 0.01):
+    """
+    :param path: The SQLite database file; created if it does not exist
+    :param ttl: The lifetime of an entry in seconds
+    :param maxEntries: The maximum number of entries kept
+    :param lockTimeout: The longest wait for the database lock in seconds, once opened
+    """
+    self._ttl = ttl
+    self._maxEntries = maxEntries
+    self._hits = 0
+    self._misses = 0
+    self._lockedCount = 0
+    # Other processes may hold the write lock briefly while inserting; worth waiting for while starting up
+    self._db = sqlite3.connect(path, timeout = 10, isolation_level = None)
+    self._db.execute("PRAGMA journal_mode=WAL")
+    self._db.execute(
+      "CREATE TABLE IF NOT EXISTS translations ("
+      " ori_url TEXT PRIMARY KEY,"
+      " src_url TEXT NOT NULL,"
+      " created REAL NOT NULL,"
+      " last_access REAL NOT NULL)")
+    self._db.execute(
+      "CREATE INDEX IF NOT EXISTS translations_last_access ON translations (last_access)")
+    self._db.execute("PRAGMA busy_timeout = " + str(int(lockTimeout * 1000)))
+
+  def get(self, oriUrl):
+    """
+    :return: The cached translation of oriUrl, or None if missing or expired
+    """
+    now = time.time()
+    row = self._tryExecute(
+      "SELECT src_url, created FROM translations WHERE ori_url = ?", (oriUrl,))
+    if row is not None:
+      row = row.fetchone()
+    if row is None:
+      self._misses += 1
+      return None
+    if now - row[1] > self._ttl:
+      self._tryExecute("DELETE FROM translations WHERE ori_url = ?", (oriUrl,))
+      self._misses += 1
+      return None
+    # Still a hit if the access time cannot be updated; the entry may only be evicted a bit early
+    self._tryExecute(
+      "UPDATE translations SET last_access = ? WHERE ori_url = ?", (now, oriUrl))
+    self._hits += 1
+    return row[0]
+
+  def put(self, oriUrl, srcUrl):
+    """
+    Store a translation, unless the database is locked by another process
+    """
+    now = time.time()
+    if self._tryExecute("BEGIN IMMEDIATE") is None:
+      return
+    try:
+      self._db.execute(
+        "INSERT OR REPLACE INTO translations (ori_url, src_url, created, last_access)"
+        " VALUES (?, ?, ?, ?)", (oriUrl, srcUrl, now, now))
+      count = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+      if count > self._maxEntries:
+        self._db.execute(
+          "DELETE FROM translations WHERE ori_url IN"
+          " (SELECT ori_url FROM translations ORDER BY last_access LIMIT ?)",
+          (count - self._maxEntries,))
+      self._db.execute("COMMIT")
+    except Exception:
+      self._db.execute("ROLLBACK")
+      raise
+
+  def purgeExpired(self):
+    """
+    Remove all expired entries
+    :return: The number of entries removed
+    """
+    cursor = self._db.execute(
+      "DELETE FROM translations WHERE created < ?", (time.time() - self._ttl,))
+    return cursor.rowcount
+
+  def getHitCount(self):
+    return self._hits
+
+  def getLockedCount(self):
+    """
+    :return: The number of lookups and updates given up on as the database was locked
+    """
+    return self._lockedCount
+
+  def getMissCount(self):
+    return self._misses
+
+  def __len__(self):
+    return self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+  def close(self):
+    self._db.close()
+
+  def _tryExecute(self, sql, parameters = ()):
+    """
+    :return: The cursor, or None if the database stayed locked for longer than the lock timeout
+    """
+    try:
+      return self._db.execute(sql, parameters)
+    except sqlite3.OperationalError as e:
+      if 'locked' not in str(e):
+        raise
+      self._lockedCount += 1
+      return None
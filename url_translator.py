@@ -0,0 +1,167 @@
+import heapq
+import socket
+import threading
+import functools
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+  import httplib
+except ImportError:
+  import http.client as httplib
+
+try:
+  from urlparse import urlparse
+  from urllib import urlencode
+except ImportError:
+  from urllib.parse import urlparse, urlencode
+
+class UrlTranslator(object):
+  """
+  Asks the translation service for the playable URL of a source URL without
+  blocking the event loop. Requests run on a bounded thread pool, each worker
+  keeping its own keep-alive connection to the service, and concurrent
+  requests for the same source URL share a single request. Requests waiting
+  for a free worker are sent earliest deadline first, except that requests
+  already past their deadline wait until no other request can still make
+  its own. Callbacks are always called on the event loop's thread.
+  """
+  def __init__(self, loop, serviceUrl, maxConcurrency = 4, timeout = 10):
+    """
+    :param loop: The asyncio (or trollius) event loop the callbacks run on
+    :param serviceUrl: The URL of the translation service
+    :param maxConcurrency: The maximum number of requests in flight at once
+    :param timeout: The timeout of each request in seconds
+    """
+    self._loop = loop
+    self._serviceUrl = urlparse(serviceUrl)
+    self._timeout = timeout
+    self._maxConcurrency = maxConcurrency
+    self._executor = ThreadPoolExecutor(max_workers = maxConcurrency)
+    # (deadline, sequence, src_url) of the requests waiting for a free worker, and
+    # of the ones among them past their deadline; entries whose deadline was moved
+    # earlier since are skipped
+    self._queue = []
+    self._lateQueue = []
+    # src_url -> deadline, for the requests waiting
+    self._queuedDeadline = dict()
+    self._sequence = 0
+    self._activeCount = 0
+    self._local = threading.local()
+    # src_url -> list of callbacks waiting for its translation
+    self._inFlight = dict()
+
+  def translate(self, srcUrl, onTranslated, onFailed, deadline = None):
+    """
+    Translate srcUrl; exactly one of the callbacks is called, on the loop thread.
+    :param onTranslated: Called as onTranslated(videoUrl)
+    :param onFailed: Called as onFailed(exception)
+    :param deadline: The loop time the result is needed by, or None if not urgent
+    """
+    if deadline is None:
+      deadline = float('inf')
+    if srcUrl in self._inFlight:
+      self._inFlight[srcUrl].append((onTranslated, onFailed))
+      if deadline < self._queuedDeadline.get(srcUrl, deadline):
+        self._enqueue(srcUrl, deadline)
+        self._dispatch()
+      return
+    self._inFlight[srcUrl] = [(onTranslated, onFailed)]
+    self._enqueue(srcUrl, deadline)
+    self._dispatch()
+
+  def getInFlightCount(self):
+    return len(self._inFlight)
+
+  def getQueuedCount(self):
+    """
+    :return: The number of requests waiting for a free worker
+    """
+    return len(self._queuedDeadline)
+
+  def _enqueue(self, srcUrl, deadline):
+    self._queuedDeadline[srcUrl] = deadline
+    heapq.heappush(self._queue, (deadline, self._sequence, srcUrl))
+    self._sequence += 1
+
+  def _dispatch(self):
+    now = self._loop.time()
+    while self._activeCount < self._maxConcurrency and (self._queue or self._lateQueue):
+      # Serving a request that missed its deadline first would only make the next ones miss theirs
+      while self._queue and self._queue[0][0] < now:
+        heapq.heappush(self._lateQueue, heapq.heappop(self._queue))
+      deadline, _, srcUrl = heapq.heappop(self._queue if self._queue else self._lateQueue)
+      if self._queuedDeadline.get(srcUrl) != deadline:
+        continue
+      del self._queuedDeadline[srcUrl]
+      self._activeCount += 1
+      future = self._submit(srcUrl)
+      future.add_done_callback(functools.partial(self._onRequestDone, srcUrl))
+
+  def _submit(self, srcUrl):
+    """
+    Start the request for srcUrl; overridden by the translation stub of dry runs
+    :return: A future of the translated URL, completing on the loop thread
+    """
+    return self._loop.run_in_executor(self._executor, self._request, srcUrl)
+
+  def shutdown(self, wait = False):
+    self._executor.shutdown(wait)
+
+  def _onRequestDone(self, srcUrl, future):
+    self._activeCount -= 1
+    self._dispatch()
+    callbacks = self._inFlight.pop(srcUrl, [])
+    exception = future.exception()
+    for onTranslated, onFailed in callbacks:
+      if exception is not None:
+        onFailed(exception)
+      else:
+        onTranslated(future.result())
+
+  def _getConnection(self):
+    connection = getattr(self._local, 'connection', None)
+    if connection is None:
+      if self._serviceUrl.scheme == 'https':
+        connection = httplib.HTTPSConnection(self._serviceUrl.netloc, timeout = self._timeout)
+      else:
+        connection = httplib.HTTPConnection(self._serviceUrl.netloc, timeout = self._timeout)
+      self._local.connection = connection
+    return connection
+
+  def _closeConnection(self):
+    connection = getattr(self._local, 'connection', None)
+    if connection is not None:
+      connection.close()
+      self._local.connection = None
+
+  def _request(self, srcUrl):
+    # Runs on a worker thread
+    body = urlencode({'url' : srcUrl, 'fetchIfNotExist' : 'true'})
+    headers = {'Content-Type': 'application/x-www-form-urlencoded',
+               'Connection': 'keep-alive'}
+    path = self._serviceUrl.path or '/'
+    if self._serviceUrl.query:
+      path += '?' + self._serviceUrl.query
+
+    # A kept-alive connection may have been closed by the server since its
+    # last use; that is retried once on a fresh connection
+    for attempt in range(2):
+      reused = getattr(self._local, 'connection', None) is not None
+      connection = self._getConnection()
+      try:
+        connection.request('POST', path, body, headers)
+        response = connection.getresponse()
+        result = response.read()
+      except (httplib.HTTPException, IOError) as e:
+        self._closeConnection()
+        if reused and attempt == 0 and not isinstance(e, socket.timeout):
+          continue
+        raise
+      if response.status != 200:
+        raise IOError("Translation service returned " + str(response.status) + " for " + srcUrl)
+      if response.getheader('Connection', '').lower() == 'close':
+        self._closeConnection()
+      if not isinstance(result, str):
+        result = result.decode('utf-8')
+      return result
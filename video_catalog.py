@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+
+class VideoCatalog(object):
+  """
+  The merged title -> videoId lookup of several Youtube channels, recording
+  which channel each title came from.
+
+  Titles are matched case-insensitively. When a title exists in more than
+  one channel, the channel listed first wins, whichever finished loading
+  first; the other candidates are kept in getCollisions().
+  """
+  def __init__(self):
+    # lower case title -> (videoId, channel)
+    self._entries = dict()
+    # lower case title -> [(videoId, channel)] of the losing candidates
+    self._collisions = dict()
+    self._failedChannels = []
+
+  def addChannel(self, channel, titles):
+    """
+    Merge the titles of a channel; channels must be added in priority order
+    :param channel: The name of the channel
+    :param titles: A dict of title -> videoId
+    """
+    for title, videoId in titles.items():
+      key = title.lower()
+      if key in self._entries:
+        if self._entries[key][0] != videoId:
+          self._collisions.setdefault(key, []).append((videoId, channel))
+      else:
+        self._entries[key] = (videoId, channel)
+
+  def getVideoId(self, title):
+    entry = self._entries.get(title.lower())
+    return None if entry is None else entry[0]
+
+  def getChannel(self, title):
+    """
+    :return: The channel title was taken from, or None
+    """
+    entry = self._entries.get(title.lower())
+    return None if entry is None else entry[1]
+
+  def getVideoUrlDict(self):
+    """
+    :return: The catalog as a dict of lower case title -> videoId
+    :rtype: dict
+    """
+    return dict((title, entry[0]) for title, entry in self._entries.items())
+
+  def getCollisions(self):
+    return self._collisions
+
+  def getFailedChannels(self):
+    """
+    :return: [(channel, exception)] for the channels that could not be listed
+    """
+    return self._failedChannels
+
+  def __len__(self):
+    return len(self._entries)
+
+def loadCatalog(channels, maxWorkers = 4):
+  """
+  List several channels in parallel and merge them into one VideoCatalog.
+  A channel that fails to load, or lists something other than a dict, is
+  reported and left out, so one revoked credential does not stop the screening.
+  :param channels: A list of (channel, fetchTitles) in priority order, where
+    fetchTitles() returns the channel's dict of title -> videoId
+  :param maxWorkers: The maximum number of channels listed at once
+  :rtype: VideoCatalog
+  """
+  catalog = VideoCatalog()
+  executor = ThreadPoolExecutor(max_workers = maxWorkers)
+  try:
+    futures = [(channel, executor.submit(fetchTitles)) for channel, fetchTitles in channels]
+    # Merged in the order given, not the order of completion, so that
+    # collisions resolve the same way on every run
+    for channel, future in futures:
+      try:
+        titles = future.result()
+        if not isinstance(titles, dict):
+          raise ValueError("expected a dict of title -> videoId, got " + type(titles).__name__)
+      except Exception as e:
+        print("Warning: could not list videos of channel " + str(channel) + ": " + str(e))
+        catalog._failedChannels.append((channel, e))
+        continue
+      catalog.addChannel(channel, titles)
+  finally:
+    executor.shutdown(False)
+  return catalog